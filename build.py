@@ -1,5 +1,23 @@
 import PyInstaller.__main__
 
+# Módulos Qt que o app não usa: ficam fora do pacote (menos a extrair no início)
+EXCLUDED_MODULES = [
+    'PySide6.QtQml',
+    'PySide6.QtQuick',
+    'PySide6.QtQuickWidgets',
+    'PySide6.QtWebEngineCore',
+    'PySide6.QtWebEngineWidgets',
+    'PySide6.QtWebChannel',
+    'PySide6.QtMultimedia',
+    'PySide6.QtPdf',
+    'PySide6.QtCharts',
+    'PySide6.QtDataVisualization',
+    'PySide6.Qt3DCore',
+    'PySide6.QtSql',
+    'PySide6.QtTest',
+    'tkinter',
+]
+
 PyInstaller.__main__.run([
     'main.py',
     '--name=freerdp-gui',
@@ -10,5 +28,8 @@ PyInstaller.__main__.run([
     '--hidden-import=PySide6.QtCore',
     '--hidden-import=PySide6.QtGui',
     '--hidden-import=PySide6.QtWidgets',
-    '--hidden-import=cryptography'
-])
\ No newline at end of file
+    '--hidden-import=PySide6.QtNetwork',
+    '--hidden-import=PySide6.QtDBus',
+    '--hidden-import=cryptography',
+    *[f'--exclude-module={m}' for m in EXCLUDED_MODULES],
+])
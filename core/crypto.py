@@ -4,8 +4,12 @@ Com master password opcional - usa chave padrão quando não configurada
 """
 
 import os
+import json
+import getpass
+import platform
 import base64
 import hashlib
+import time
 import logging
 from typing import Optional, Tuple
 from pathlib import Path
@@ -13,8 +17,64 @@ from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
+from .utils import preparar_arquivo_atomico, substituir_arquivo, escrever_arquivo_atomico
+
+try:
+    from cryptography.hazmat.primitives.kdf.argon2 import Argon2id
+except ImportError:
+    # cryptography < 44: master password continua com PBKDF2
+    Argon2id = None
+
 logger = logging.getLogger(__name__)
 
+# Parâmetros de derivação da master password personalizada
+PBKDF2_ITERATIONS = 100000  # Recomendado pelo OWASP (2024)
+ARGON2_MEMORY_COST = 65536  # KiB (64 MiB)
+ARGON2_PARALLELISM = 2
+
+# Calibração na primeira configuração da master password
+KDF_TARGET_SECONDS = 0.75
+ARGON2_MIN_MEMORY_COST = 19456  # KiB, mínimo recomendado pelo OWASP
+ARGON2_MAX_TIME_COST = 16
+
+def _b64_encode_nopad(data: bytes) -> str:
+    """Base64 sem padding, como no formato PHC"""
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+def _b64_decode_nopad(data: str) -> bytes:
+    """Decodifica base64 sem padding"""
+    return base64.b64decode(data + '=' * (-len(data) % 4))
+
+def _format_kdf_header(algorithm: str, params: dict, salt: bytes) -> str:
+    """
+    Monta cabeçalho de KDF no formato PHC (sem o hash)
+    
+    Ex.: $argon2id$v=19$m=65536,t=2,p=2$<salt>
+    """
+    param_str = ','.join(f"{k}={v}" for k, v in params.items())
+    if algorithm == 'argon2id':
+        return f"$argon2id$v=19${param_str}${_b64_encode_nopad(salt)}"
+    return f"${algorithm}${param_str}${_b64_encode_nopad(salt)}"
+
+def _parse_kdf_header(header: str) -> Tuple[str, dict, bytes]:
+    """
+    Interpreta cabeçalho de KDF no formato PHC
+    
+    Returns:
+        Tupla (algoritmo, parâmetros, salt)
+        
+    Raises:
+        ValueError: Se o cabeçalho for inválido
+    """
+    parts = header.strip().split('$')
+    # ['', algoritmo, (v=19,) parâmetros, salt]
+    if len(parts) < 4 or parts[0] != '':
+        raise ValueError(f"Cabeçalho de KDF inválido: {header!r}")
+    algorithm = parts[1]
+    param_str, salt_str = parts[-2], parts[-1]
+    params = {k: int(v) for k, v in (item.split('=') for item in param_str.split(','))}
+    return algorithm, params, _b64_decode_nopad(salt_str)
+
 class CryptoManager:
     """Gerenciador de criptografia para senhas com master password opcional"""
     
@@ -35,9 +95,12 @@ class CryptoManager:
         self.config_dir = config_dir
         self.config_dir.mkdir(parents=True, exist_ok=True)
         
-        # Arquivo para armazenar salt da master password
+        # Arquivo para armazenar salt da master password (formato legado, PBKDF2)
         self.master_salt_file = self.config_dir / '.master_salt'
         
+        # Cabeçalho PHC com algoritmo, parâmetros e salt da master password
+        self.master_kdf_file = self.config_dir / '.master_kdf'
+        
         # Arquivo que indica se usuário configurou master password personalizada
         self.has_custom_password_file = self.config_dir / '.has_custom_password'
         
@@ -45,6 +108,9 @@ class CryptoManager:
         self._cached_key = None
         self._is_using_default_key = False
         
+        # (chave, Fernet) da sessão: tupla trocada de uma vez, segura entre threads
+        self._fernet_cache = (None, None)
+        
         # Auto-inicializar com chave apropriada
         self._auto_initialize()
         
@@ -73,9 +139,6 @@ class CryptoManager:
         """Usa chave padrão baseada no sistema"""
         try:
             # Criar senha padrão única para este sistema/usuário
-            import platform
-            import getpass
-            
             system_info = f"{platform.node()}-{getpass.getuser()}-{self.DEFAULT_PASSWORD_BASE}"
             default_password = hashlib.sha256(system_info.encode()).hexdigest()[:32]
             
@@ -89,46 +152,15 @@ class CryptoManager:
             self._cached_key = None
             self._is_using_default_key = False
     
-    def _get_or_create_master_salt(self, use_default_salt: bool = False) -> bytes:
+    def _get_default_salt(self) -> bytes:
         """
-        Obtém ou cria salt para a master password
-        
-        Args:
-            use_default_salt: Se True, usa salt fixo para chave padrão
+        Salt fixo da chave padrão (baseado no sistema)
         
         Returns:
             Salt de 32 bytes
         """
-        if use_default_salt:
-            # Salt fixo para chave padrão (baseado no sistema)
-            import platform
-            salt_base = f"{self.DEFAULT_PASSWORD_BASE}-{platform.system()}"
-            return hashlib.sha256(salt_base.encode()).digest()
-        
-        # Salt personalizado para master password do usuário
-        if self.master_salt_file.exists():
-            try:
-                with open(self.master_salt_file, 'rb') as f:
-                    salt = f.read()
-                if len(salt) == 32:
-                    return salt
-                logger.warning("Salt inválido encontrado, criando novo")
-            except Exception as e:
-                logger.warning(f"Erro ao ler salt: {e}, criando novo")
-        
-        # Criar novo salt
-        salt = os.urandom(32)
-        try:
-            with open(self.master_salt_file, 'wb') as f:
-                f.write(salt)
-            # Definir permissões restritas (só o usuário pode ler)
-            os.chmod(self.master_salt_file, 0o600)
-            logger.info("Novo salt da master password criado")
-        except Exception as e:
-            logger.error(f"Erro ao salvar salt: {e}")
-            raise
-        
-        return salt
+        salt_base = f"{self.DEFAULT_PASSWORD_BASE}-{platform.system()}"
+        return hashlib.sha256(salt_base.encode()).digest()
     
     def _derive_key_from_password(self, password: str, use_default_salt: bool = False) -> bytes:
         """
@@ -140,19 +172,250 @@ class CryptoManager:
             
         Returns:
             Chave de 32 bytes para Fernet
+            
+        Raises:
+            ValueError: Se não há parâmetros de master password personalizada
+                (são criados só em set_master_password/calibrate_kdf)
         """
-        salt = self._get_or_create_master_salt(use_default_salt)
+        if not use_default_salt:
+            header = self._load_kdf_header()
+            if header is None:
+                raise ValueError("Parâmetros da master password não encontrados")
+            return self._derive_key_from_header(password, header)
+        
+        salt = self._get_default_salt()
         
         kdf = PBKDF2HMAC(
             algorithm=hashes.SHA256(),
             length=32,
             salt=salt,
-            iterations=100000,  # Recomendado pelo OWASP (2024)
+            iterations=PBKDF2_ITERATIONS,
         )
         
         key = base64.urlsafe_b64encode(kdf.derive(password.encode('utf-8')))
         return key
     
+    def _load_kdf_header(self) -> Optional[str]:
+        """
+        Lê o cabeçalho de KDF da master password personalizada
+        
+        Instalações anteriores só têm o .master_salt; nesse caso o cabeçalho
+        PBKDF2 equivalente é montado a partir dele.
+        
+        Returns:
+            Cabeçalho PHC ou None se não houver master password configurada
+        """
+        try:
+            if self.master_kdf_file.exists():
+                return self.master_kdf_file.read_text(encoding='utf-8').strip()
+            if self.master_salt_file.exists():
+                salt = self.master_salt_file.read_bytes()
+                if len(salt) == 32:
+                    return _format_kdf_header('pbkdf2-sha256', {'i': PBKDF2_ITERATIONS}, salt)
+                logger.warning("Salt inválido encontrado, ignorando")
+        except Exception as e:
+            logger.warning(f"Erro ao ler parâmetros da master password: {e}")
+        return None
+    
+    def calibrate_kdf(self, target_seconds: float = KDF_TARGET_SECONDS) -> Optional[str]:
+        """
+        Ajusta o custo da KDF ao hardware atual antes da primeira master password
+        
+        Mede uma derivação e escolhe os parâmetros para que uma derivação
+        leve cerca de target_seconds. O cabeçalho resultante é gravado em
+        .master_kdf e usado verbatim nos desbloqueios seguintes.
+        
+        Args:
+            target_seconds: Tempo alvo de uma derivação
+            
+        Returns:
+            Cabeçalho gravado ou None se já há master password configurada
+        """
+        if self.has_custom_master_password():
+            return None
+        
+        header = self._calibrated_kdf_header(target_seconds)
+        self._save_kdf_header(header)
+        logger.info(f"KDF calibrada: {header.rsplit('$', 1)[0]}")
+        return header
+    
+    def _calibrated_kdf_header(self, target_seconds: float = KDF_TARGET_SECONDS) -> str:
+        """Mede a KDF neste hardware e monta um cabeçalho com salt novo (sem gravar)"""
+        salt = os.urandom(32)
+        
+        if Argon2id is not None:
+            memory_cost = ARGON2_MEMORY_COST
+            while True:
+                elapsed = self._time_kdf('argon2id', {'m': memory_cost, 't': 1, 'p': ARGON2_PARALLELISM})
+                # Hardware lento: reduzir memória até caber no alvo com t=1
+                if elapsed <= target_seconds or memory_cost // 2 < ARGON2_MIN_MEMORY_COST:
+                    break
+                memory_cost //= 2
+            time_cost = int(target_seconds / max(elapsed, 1e-6))
+            time_cost = max(1, min(time_cost, ARGON2_MAX_TIME_COST))
+            params = {'m': memory_cost, 't': time_cost, 'p': ARGON2_PARALLELISM}
+            header = _format_kdf_header('argon2id', params, salt)
+        else:
+            sample = 10000
+            elapsed = self._time_kdf('pbkdf2-sha256', {'i': sample})
+            iterations = int(sample * target_seconds / max(elapsed, 1e-6))
+            header = _format_kdf_header('pbkdf2-sha256', {'i': max(iterations, PBKDF2_ITERATIONS)}, salt)
+        return header
+    
+    def _time_kdf(self, algorithm: str, params: dict) -> float:
+        """Mede o tempo de uma derivação com os parâmetros informados"""
+        header = _format_kdf_header(algorithm, params, b'\x00' * 16)
+        start = time.perf_counter()
+        self._derive_key_from_header('x' * 16, header)
+        return time.perf_counter() - start
+    
+    def _new_kdf_header(self, current: Optional[str]) -> str:
+        """
+        Gera cabeçalho com salt novo para trocar a chave da master password
+        
+        Mantém algoritmo e parâmetros do cabeçalho atual (que podem ter sido
+        calibrados); cabeçalhos PBKDF2 que podem migrar para Argon2id, ou a
+        falta de cabeçalho, levam a uma nova calibração.
+        
+        Args:
+            current: Cabeçalho em uso
+        """
+        if current is None or self._is_legacy_kdf(current):
+            return self._calibrated_kdf_header()
+        algorithm, params, _ = _parse_kdf_header(current)
+        return _format_kdf_header(algorithm, params, os.urandom(32))
+    
+    def _save_kdf_header(self, header: str):
+        """Grava cabeçalho de KDF com permissões restritas"""
+        escrever_arquivo_atomico(self.master_kdf_file, header + '\n', 0o600)
+    
+    def _stage_kdf_header(self, header: str) -> Path:
+        """Deixa o novo cabeçalho pronto no disco sem substituir o atual"""
+        return preparar_arquivo_atomico(self.master_kdf_file, header + '\n', 0o600)
+    
+    def _commit_kdf_header(self, staged: Path):
+        """
+        Ativa o cabeçalho preparado por _stage_kdf_header
+        
+        Chamado só depois que o INI já foi gravado com a nova chave; a partir
+        daí não há como voltar, então falhas são registradas e não propagadas.
+        """
+        try:
+            substituir_arquivo(staged, self.master_kdf_file)
+        except Exception as e:
+            logger.error(f"Erro ao gravar parâmetros da nova master password ({staged}): {e}")
+            return
+        try:
+            if self.master_salt_file.exists():
+                self.master_salt_file.unlink()
+        except Exception as e:
+            logger.warning(f"Erro ao remover salt antigo: {e}")
+    
+    def _discard_staged_header(self, staged: Path):
+        """Remove cabeçalho preparado que não chegou a ser usado"""
+        try:
+            staged.unlink(missing_ok=True)
+        except Exception as e:
+            logger.warning(f"Erro ao remover {staged}: {e}")
+    
+    def _derive_key_from_header(self, password: str, header: str) -> bytes:
+        """
+        Deriva chave Fernet usando algoritmo e parâmetros do cabeçalho
+        
+        Args:
+            password: Master password
+            header: Cabeçalho PHC (argon2id ou pbkdf2-sha256)
+            
+        Returns:
+            Chave de 32 bytes para Fernet
+        """
+        algorithm, params, salt = _parse_kdf_header(header)
+        
+        if algorithm == 'argon2id':
+            if Argon2id is None:
+                raise RuntimeError("Argon2id não suportado por esta versão do cryptography")
+            kdf = Argon2id(
+                salt=salt,
+                length=32,
+                iterations=params['t'],
+                lanes=params['p'],
+                memory_cost=params['m'],
+            )
+        elif algorithm == 'pbkdf2-sha256':
+            kdf = PBKDF2HMAC(
+                algorithm=hashes.SHA256(),
+                length=32,
+                salt=salt,
+                iterations=params['i'],
+            )
+        else:
+            raise ValueError(f"Algoritmo de KDF desconhecido: {algorithm}")
+        
+        return base64.urlsafe_b64encode(kdf.derive(password.encode('utf-8')))
+    
+    def _is_legacy_kdf(self, header: str) -> bool:
+        """Indica se o cabeçalho usa PBKDF2 e pode ser migrado para Argon2id"""
+        return Argon2id is not None and header.startswith('$pbkdf2')
+    
+    def needs_kdf_upgrade(self) -> bool:
+        """
+        Indica se a master password ainda usa PBKDF2 e pode migrar para Argon2id
+        
+        A migração é um rekey_master_password com a mesma senha, que
+        re-criptografa o INI e deve rodar fora da thread da interface.
+        """
+        if not self.has_custom_master_password():
+            return False
+        header = self._load_kdf_header()
+        return header is not None and self._is_legacy_kdf(header)
+    
+    def _reload_servers(self):
+        """Faz o ConfigParser compartilhado enxergar o INI re-criptografado"""
+        from .servidores import get_servidor_manager
+        get_servidor_manager().recarregar()
+    
+    def _reencrypt_all(self, old_key: bytes, new_key: bytes) -> bool:
+        """
+        Re-criptografa todas as senhas salvas da chave antiga para a nova
+        
+        Trabalha sobre uma cópia própria do INI e recebe as duas chaves
+        explicitamente: nem o ConfigParser compartilhado nem a chave da sessão
+        são tocados, então pode rodar fora da thread da interface.
+        
+        Returns:
+            True se todas as senhas foram re-criptografadas e salvas; com False
+            o INI em disco continua sob a chave antiga
+        """
+        from .servidores import get_servidor_manager
+        servidor_manager = get_servidor_manager()
+        try:
+            config = servidor_manager.ler_config_isolada()
+        except Exception as e:
+            logger.error(f"Erro ao ler configuração para re-criptografar: {e}")
+            return False
+        
+        new_fernet = Fernet(new_key)
+        changed = False
+        for section_name in config.sections():
+            if not config.has_option(section_name, 'senha_encrypted'):
+                continue
+            try:
+                password = self._decrypt_data(config[section_name]['senha_encrypted'], old_key, section_name)
+                config[section_name]['senha_encrypted'] = self._encrypt_data(
+                    password, section_name, new_fernet, 'custom'
+                )
+                changed = True
+            except Exception as e:
+                logger.error(f"Erro ao re-criptografar senha de {section_name}: {e}")
+                return False
+        
+        if changed:
+            try:
+                servidor_manager.salvar_config_isolada(config)
+            except Exception:
+                return False
+        return True
+    
     def set_master_password(self, password: str) -> bool:
         """
         Define a master password personalizada para a sessão
@@ -164,6 +427,10 @@ class CryptoManager:
             True se senha foi aceita
         """
         try:
+            # Primeira configuração: único ponto (além de calibrate_kdf) que cria .master_kdf
+            if not self.has_custom_master_password() and self._load_kdf_header() is None:
+                self.calibrate_kdf()
+            
             key = self._derive_key_from_password(password, use_default_salt=False)
             
             # Se já existem dados criptografados, validar senha
@@ -211,7 +478,7 @@ class CryptoManager:
             # Obter todos os dados criptografados
             from .servidores import get_servidor_manager
             servidor_manager = get_servidor_manager()
-            servidor_manager.config.read(servidor_manager.ini_path, encoding='utf-8')
+            servidor_manager._ler_config()
             
             # Descriptografar com chave padrão e re-criptografar com chave personalizada
             migrated_count = 0
@@ -264,7 +531,7 @@ class CryptoManager:
             
             from .servidores import get_servidor_manager
             servidor_manager = get_servidor_manager()
-            servidor_manager.config.read(servidor_manager.ini_path, encoding='utf-8')
+            servidor_manager._ler_config()
             
             # Descriptografar todos com chave atual
             for section_name in servidor_manager.config.sections():
@@ -280,6 +547,8 @@ class CryptoManager:
             try:
                 if self.master_salt_file.exists():
                     self.master_salt_file.unlink()
+                if self.master_kdf_file.exists():
+                    self.master_kdf_file.unlink()
                 if self.has_custom_password_file.exists():
                     self.has_custom_password_file.unlink()
             except Exception as e:
@@ -304,26 +573,28 @@ class CryptoManager:
             logger.error(f"Erro ao remover master password: {e}")
             return False
     
-    def _validate_master_password(self, key: bytes) -> bool:
+    def _validate_master_password(self, key: bytes, config=None) -> bool:
         """
         Valida master password tentando descriptografar dados existentes
         
         Args:
             key: Chave derivada da senha
+            config: ConfigParser próprio a usar no lugar do compartilhado
             
         Returns:
             True se senha está correta
         """
         try:
-            from .servidores import get_servidor_manager
-            servidor_manager = get_servidor_manager()
-            
-            servidor_manager.config.read(servidor_manager.ini_path, encoding='utf-8')
+            if config is None:
+                from .servidores import get_servidor_manager
+                servidor_manager = get_servidor_manager()
+                servidor_manager._ler_config()
+                config = servidor_manager.config
             
             # Procurar primeira senha criptografada para testar
-            for section_name in servidor_manager.config.sections():
-                if servidor_manager.config.has_option(section_name, 'senha_encrypted'):
-                    encrypted_data = servidor_manager.config[section_name]['senha_encrypted']
+            for section_name in config.sections():
+                if config.has_option(section_name, 'senha_encrypted'):
+                    encrypted_data = config[section_name]['senha_encrypted']
                     try:
                         self._decrypt_data(encrypted_data, key)
                         return True
@@ -348,7 +619,7 @@ class CryptoManager:
             from .servidores import get_servidor_manager
             servidor_manager = get_servidor_manager()
             
-            servidor_manager.config.read(servidor_manager.ini_path, encoding='utf-8')
+            servidor_manager._ler_config()
             
             for section_name in servidor_manager.config.sections():
                 if servidor_manager.config.has_option(section_name, 'senha_encrypted'):
@@ -367,6 +638,22 @@ class CryptoManager:
         """
         return self._cached_key is not None
     
+    def get_fernet(self) -> Optional[Fernet]:
+        """
+        Obtém o Fernet da chave da sessão
+        
+        Returns:
+            Instância reaproveitada enquanto a chave não mudar, ou None se travado
+        """
+        key = self._cached_key
+        if key is None:
+            return None
+        cached_key, fernet = self._fernet_cache
+        if cached_key is not key:
+            fernet = Fernet(key)
+            self._fernet_cache = (key, fernet)
+        return fernet
+    
     def is_using_default_key(self) -> bool:
         """
         Verifica se está usando chave padrão
@@ -404,29 +691,8 @@ class CryptoManager:
             return None
         
         try:
-            # Criar salt único para esta senha
-            salt = os.urandom(16)
-            
-            # Criar dados para criptografar (senha + contexto + tipo de chave)
-            data_to_encrypt = {
-                'password': password,
-                'server': server_name,
-                'version': 1,
-                'key_type': 'default' if self._is_using_default_key else 'custom'
-            }
-            
-            import json
-            plain_data = json.dumps(data_to_encrypt).encode('utf-8')
-            
-            # Criptografar
-            fernet = Fernet(self._cached_key)
-            encrypted_data = fernet.encrypt(plain_data)
-            
-            # Combinar salt + dados criptografados
-            combined = salt + encrypted_data
-            
-            # Retornar como base64
-            result = base64.b64encode(combined).decode('utf-8')
+            key_type = 'default' if self._is_using_default_key else 'custom'
+            result = self._encrypt_data(password, server_name, self.get_fernet(), key_type)
             
             logger.debug(f"Senha criptografada para servidor: {server_name}")
             return result
@@ -435,6 +701,35 @@ class CryptoManager:
             logger.error(f"Erro ao criptografar senha: {e}")
             return None
     
+    def _encrypt_data(self, password: str, server_name: str, fernet: Fernet, key_type: str) -> str:
+        """
+        Criptografa uma senha com o Fernet informado
+        
+        Args:
+            password: Senha em texto claro
+            server_name: Nome do servidor (contexto adicional)
+            fernet: Instância Fernet da chave de destino
+            key_type: 'default' ou 'custom'
+            
+        Returns:
+            Senha criptografada em base64
+        """
+        # Criar salt único para esta senha
+        salt = os.urandom(16)
+        
+        # Criar dados para criptografar (senha + contexto + tipo de chave)
+        data_to_encrypt = {
+            'password': password,
+            'server': server_name,
+            'version': 1,
+            'key_type': key_type
+        }
+        
+        plain_data = json.dumps(data_to_encrypt).encode('utf-8')
+        
+        # Combinar salt + dados criptografados e retornar como base64
+        return base64.b64encode(salt + fernet.encrypt(plain_data)).decode('utf-8')
+    
     def decrypt_password(self, encrypted_data: str, server_name: str) -> Optional[str]:
         """
         Descriptografa uma senha
@@ -478,12 +773,11 @@ class CryptoManager:
         salt = combined[:16]
         encrypted = combined[16:]
         
-        # Descriptografar
-        fernet = Fernet(key)
+        # Descriptografar (chave da sessão reaproveita o Fernet em cache)
+        fernet = self.get_fernet() if key is self._cached_key else Fernet(key)
         decrypted_data = fernet.decrypt(encrypted)
         
         # Parse JSON
-        import json
         data = json.loads(decrypted_data.decode('utf-8'))
         
         # Validar contexto se fornecido
@@ -503,64 +797,71 @@ class CryptoManager:
         Returns:
             True se alteração foi bem sucedida
         """
+        # Se não tem master password personalizada, old_password será ignorada
+        if not self.has_custom_master_password():
+            logger.info("Definindo primeira master password personalizada")
+            return self.set_master_password(new_password)
+        
+        new_key = self.rekey_master_password(old_password, new_password)
+        if new_key is None:
+            return False
+        self.activate_key(new_key)
+        return True
+    
+    def rekey_master_password(self, old_password: str, new_password: str) -> Optional[bytes]:
+        """
+        Re-criptografa o INI e grava os parâmetros da nova master password
+        
+        Não altera a chave da sessão nem o ConfigParser compartilhado, podendo
+        rodar fora da thread da interface. A chave retornada deve ser adotada
+        com activate_key na thread da interface.
+        
+        Args:
+            old_password: Senha atual
+            new_password: Nova senha
+            
+        Returns:
+            Nova chave ou None se a senha atual estiver incorreta/erro
+        """
         try:
-            # Se não tem master password personalizada, old_password será ignorada
-            if not self.has_custom_master_password():
-                logger.info("Definindo primeira master password personalizada")
-                return self.set_master_password(new_password)
+            from .servidores import get_servidor_manager
+            config = get_servidor_manager().ler_config_isolada()
             
             # Validar senha atual
             old_key = self._derive_key_from_password(old_password)
-            if not self._validate_master_password(old_key):
+            if not self._validate_master_password(old_key, config):
                 logger.error("Senha atual incorreta")
-                return False
-            
-            # Coletar todos os dados criptografados
-            encrypted_passwords = {}
-            
-            from .servidores import get_servidor_manager
-            servidor_manager = get_servidor_manager()
-            servidor_manager.config.read(servidor_manager.ini_path, encoding='utf-8')
-            
-            # Descriptografar todas as senhas com chave antiga
-            for section_name in servidor_manager.config.sections():
-                if servidor_manager.config.has_option(section_name, 'senha_encrypted'):
-                    encrypted_data = servidor_manager.config[section_name]['senha_encrypted']
-                    try:
-                        plain_password = self._decrypt_data(encrypted_data, old_key, section_name)
-                        encrypted_passwords[section_name] = plain_password
-                    except Exception as e:
-                        logger.error(f"Erro ao descriptografar senha de {section_name}: {e}")
-                        return False
+                return None
             
-            # Gerar nova chave
-            new_key = self._derive_key_from_password(new_password)
-            
-            # Re-criptografar todas as senhas com nova chave
-            self._cached_key = new_key
-            self._is_using_default_key = False
-            
-            for section_name, password in encrypted_passwords.items():
-                new_encrypted = self.encrypt_password(password, section_name)
-                if new_encrypted:
-                    servidor_manager.config[section_name]['senha_encrypted'] = new_encrypted
-                else:
-                    logger.error(f"Erro ao re-criptografar senha de {section_name}")
-                    return False
-            
-            # Salvar configuração
-            servidor_manager._salvar_config()
-            
-            # Remover salt antigo e criar novo
-            if self.master_salt_file.exists():
-                self.master_salt_file.unlink()
-            
-            logger.info("Master password alterada com sucesso")
-            return True
+            # Gerar nova chave com salt novo e os parâmetros atuais
+            new_header = self._new_kdf_header(self._load_kdf_header())
+            new_key = self._derive_key_from_header(new_password, new_header)
+            staged = self._stage_kdf_header(new_header)
             
         except Exception as e:
             logger.exception("Erro ao alterar master password")
-            return False
+            return None
+        
+        # Re-criptografar todas as senhas; o cabeçalho antigo vale até o INI ser gravado
+        if not self._reencrypt_all(old_key, new_key):
+            self._discard_staged_header(staged)
+            return None
+        
+        # Dados já estão sob a nova chave: quem chamou precisa adotá-la
+        self._commit_kdf_header(staged)
+        logger.info("Master password alterada com sucesso")
+        return new_key
+    
+    def activate_key(self, key: bytes):
+        """
+        Adota a chave devolvida por rekey_master_password na sessão
+        
+        Deve ser chamado na thread da interface: troca a chave em cache e
+        recarrega o ConfigParser compartilhado com o INI re-criptografado.
+        """
+        self._cached_key = key
+        self._is_using_default_key = False
+        self._reload_servers()
     
     def get_status_info(self) -> dict:
         """
@@ -587,7 +888,7 @@ class CryptoManager:
         try:
             from .servidores import get_servidor_manager
             servidor_manager = get_servidor_manager()
-            servidor_manager.config.read(servidor_manager.ini_path, encoding='utf-8')
+            servidor_manager._ler_config()
             
             exported = {}
             for section_name in servidor_manager.config.sections():
@@ -3,6 +3,8 @@ Módulo para conexões RDP
 """
 
 import os
+import signal
+import threading
 import subprocess
 import logging
 from typing import Dict, Optional
@@ -50,28 +52,53 @@ if PYSIDE6_AVAILABLE:
     class RDPThread(QThread):
         """Thread para executar conexão RDP sem travar a interface"""
         
-        finished = Signal(bool, str)
-        started = Signal()
+        # Nomes próprios para não esconder QThread.started/finished
+        conexao_iniciada = Signal()
+        conexao_finalizada = Signal(bool, str)
         
-        def __init__(self, host: str, usuario: str, senha: str, opcoes: Dict):
-            super().__init__()
+        def __init__(self, host: str, usuario: str, senha: str, opcoes: Dict, parent=None):
+            super().__init__(parent)
             self.host = host
             self.usuario = usuario
             self.senha = senha
             self.opcoes = opcoes or {}
+            # Processo do FreeRDP, acessado também pela thread da interface em parar()
+            self._lock = threading.Lock()
+            self._processo: Optional[subprocess.Popen] = None
+            self._parada_solicitada = False
+        
+        def parar(self, forcar: bool = False):
+            """
+            Encerra o FreeRDP desta conexão sem bloquear quem chama
+            
+            Pode ser chamado de qualquer thread; run() termina assim que o
+            processo sair.
+            
+            Args:
+                forcar: Usa SIGKILL em vez de SIGTERM
+            """
+            with self._lock:
+                self._parada_solicitada = True
+                processo = self._processo
+            if processo is not None and processo.poll() is None:
+                try:
+                    # Sessão própria: o pgid é o pid do FreeRDP
+                    os.killpg(processo.pid, signal.SIGKILL if forcar else signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
         
         def run(self):
             """Executa conexão RDP"""
             try:
-                self.started.emit()
+                self.conexao_iniciada.emit()
                 self._conectar_rdp()
-                self.finished.emit(True, "Conexão RDP finalizada")
+                self.conexao_finalizada.emit(True, "Conexão RDP finalizada")
             except RDPConnectionError as e:
                 logger.error(f"Erro RDP: {str(e)}")
-                self.finished.emit(False, str(e))
+                self.conexao_finalizada.emit(False, str(e))
             except Exception as e:
                 logger.exception("Erro durante conexão RDP")
-                self.finished.emit(False, f"Erro inesperado: {str(e)}")
+                self.conexao_finalizada.emit(False, f"Erro inesperado: {str(e)}")
         
         def _conectar_rdp(self):
             """Estabelece conexão RDP com opções avançadas"""
@@ -81,10 +108,24 @@ if PYSIDE6_AVAILABLE:
             logger.debug(f"Comando RDP: {' '.join(cmd[:10])}...")  # Log parcial por segurança
             
             try:
-                resultado = subprocess.run(cmd, capture_output=True, text=True)
+                with self._lock:
+                    if self._parada_solicitada:
+                        return
+                    # Sessão própria: o sinal de parar() alcança também os
+                    # processos criados pelo flatpak run
+                    self._processo = subprocess.Popen(
+                        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                        text=True, start_new_session=True
+                    )
+                _, stderr = self._processo.communicate()
+                returncode = self._processo.returncode
+                
+                if self._parada_solicitada:
+                    logger.info(f"Conexão RDP para {self.host} encerrada pelo aplicativo")
+                    return
                 
-                if resultado.returncode != 0:
-                    stderr = resultado.stderr.strip() if resultado.stderr else ""
+                if returncode != 0:
+                    stderr = stderr.strip()
                     
                     # Mensagens que indicam encerramento NORMAL (não erro real)
                     mensagens_normais = [
@@ -110,7 +151,7 @@ if PYSIDE6_AVAILABLE:
                             raise RDPConnectionError(f"Conexão RDP falhou: {error_msg}")
                     else:
                         # Apenas warnings ou sem mensagens = encerramento normal
-                        logger.info(f"Conexão RDP encerrada normalmente (código {resultado.returncode})")
+                        logger.info(f"Conexão RDP encerrada normalmente (código {returncode})")
                     
             except subprocess.TimeoutExpired:
                 raise RDPConnectionError("Timeout na conexão RDP")
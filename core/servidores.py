@@ -2,12 +2,14 @@
 Módulo para gerenciamento de servidores via arquivo INI com criptografia de senhas
 """
 
+import io
+import stat
 import logging
 import configparser
-from typing import Dict, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 from pathlib import Path
 
-from .utils import get_ini_path, validar_ip_porta, normalizar_ip_porta
+from .utils import get_ini_path, validar_ip_porta, normalizar_ip_porta, escrever_arquivo_atomico
 from .crypto import get_crypto_manager
 
 logger = logging.getLogger(__name__)
@@ -18,6 +20,8 @@ class ServidorManager:
     def __init__(self):
         self.ini_path = get_ini_path()
         self.config = configparser.ConfigParser()
+        # (inode, mtime_ns, tamanho) do INI na última leitura/gravação
+        self._config_stamp: Optional[Tuple[int, int, int]] = None
         self.crypto_manager = get_crypto_manager()
         self._criar_arquivo_exemplo_se_necessario()
     
@@ -56,7 +60,7 @@ class ServidorManager:
         servidores = {}
         
         try:
-            self.config.read(self.ini_path, encoding='utf-8')
+            self._ler_config()
             
             for secao in self.config.sections():
                 try:
@@ -160,6 +164,47 @@ class ServidorManager:
             logger.error(f"Erro ao salvar senha para '{nome_servidor}': {str(e)}")
             return False
     
+    def salvar_senhas(self, senhas: Dict[str, str]) -> List[str]:
+        """
+        Salva várias senhas criptografadas gravando o INI uma única vez
+        
+        Args:
+            senhas: Dict com nome_servidor -> senha em texto claro
+            
+        Returns:
+            Nomes dos servidores cujas senhas foram salvas
+        """
+        if not self.crypto_manager.is_unlocked():
+            logger.error("CryptoManager não está desbloqueado para salvar senha")
+            return []
+        
+        salvos = []
+        for nome_servidor, senha in senhas.items():
+            if nome_servidor not in self.config:
+                logger.error(f"Servidor '{nome_servidor}' não existe")
+                continue
+            
+            encrypted_password = self.crypto_manager.encrypt_password(senha, nome_servidor)
+            if not encrypted_password:
+                logger.error(f"Erro ao criptografar senha para '{nome_servidor}'")
+                continue
+            
+            self.config[nome_servidor]['senha_encrypted'] = encrypted_password
+            salvos.append(nome_servidor)
+        
+        if not salvos:
+            return []
+        
+        try:
+            self._salvar_config()
+        except Exception as e:
+            logger.error(f"Erro ao salvar senhas: {str(e)}")
+            self.recarregar()
+            return []
+        
+        logger.info(f"{len(salvos)} senhas criptografadas salvas")
+        return salvos
+    
     def obter_senha(self, nome_servidor: str) -> Optional[str]:
         """
         Obtém senha descriptografada para um servidor
@@ -175,7 +220,7 @@ class ServidorManager:
             return None
         
         try:
-            self.config.read(self.ini_path, encoding='utf-8')
+            self._ler_config()
             
             if nome_servidor not in self.config:
                 logger.warning(f"Servidor '{nome_servidor}' não encontrado")
@@ -200,6 +245,35 @@ class ServidorManager:
             logger.error(f"Erro ao obter senha para '{nome_servidor}': {str(e)}")
             return None
     
+    def obter_senha_isolada(self, nome_servidor: str) -> Optional[str]:
+        """
+        Obtém senha descriptografada lendo o INI em um parser próprio
+        
+        Não toca no ConfigParser compartilhado, podendo ser chamado
+        fora da thread da interface.
+        
+        Args:
+            nome_servidor: Nome do servidor
+            
+        Returns:
+            Senha em texto claro ou None se não encontrada/erro
+        """
+        if not self.crypto_manager.is_unlocked():
+            return None
+        
+        try:
+            config = self.ler_config_isolada()
+            
+            if not config.has_option(nome_servidor, 'senha_encrypted'):
+                return None
+            
+            return self.crypto_manager.decrypt_password(
+                config[nome_servidor]['senha_encrypted'], nome_servidor
+            )
+        except Exception as e:
+            logger.error(f"Erro ao obter senha para '{nome_servidor}': {str(e)}")
+            return None
+    
     def remover_senha(self, nome_servidor: str) -> bool:
         """
         Remove senha salva de um servidor
@@ -211,7 +285,7 @@ class ServidorManager:
             True se removeu com sucesso
         """
         try:
-            self.config.read(self.ini_path, encoding='utf-8')
+            self._ler_config()
             
             if nome_servidor not in self.config:
                 logger.warning(f"Servidor '{nome_servidor}' não encontrado")
@@ -241,7 +315,7 @@ class ServidorManager:
             True se tem senha salva
         """
         try:
-            self.config.read(self.ini_path, encoding='utf-8')
+            self._ler_config()
             
             return (nome_servidor in self.config and 
                     self.config.has_option(nome_servidor, 'senha_encrypted'))
@@ -259,7 +333,7 @@ class ServidorManager:
         servidores_com_senha = []
         
         try:
-            self.config.read(self.ini_path, encoding='utf-8')
+            self._ler_config()
             
             for nome_servidor in self.config.sections():
                 if self.config.has_option(nome_servidor, 'senha_encrypted'):
@@ -305,7 +379,7 @@ class ServidorManager:
             Tupla (ip, usuario, sec) ou None se não encontrado
         """
         try:
-            self.config.read(self.ini_path, encoding='utf-8')
+            self._ler_config()
             
             if nome in self.config:
                 ip = self.config[nome].get("ip", "")
@@ -346,7 +420,7 @@ class ServidorManager:
             Lista com nomes dos servidores
         """
         try:
-            self.config.read(self.ini_path, encoding='utf-8')
+            self._ler_config()
             return sorted(self.config.sections(), key=str.lower)
         except Exception as e:
             logger.error(f"Erro ao listar servidores: {str(e)}")
@@ -363,7 +437,7 @@ class ServidorManager:
             True se servidor existe
         """
         try:
-            self.config.read(self.ini_path, encoding='utf-8')
+            self._ler_config()
             return nome in self.config
         except Exception:
             return False
@@ -430,11 +504,60 @@ class ServidorManager:
             logger.error(f"Erro ao renomear servidor: {str(e)}")
             return False
     
+    def _stamp_arquivo(self) -> Optional[Tuple[int, int, int]]:
+        """
+        Identifica a versão do INI em disco por (inode, mtime_ns, tamanho)
+        
+        O inode muda a cada os.replace, então regravações atômicas do mesmo
+        tamanho dentro da resolução do mtime também são detectadas.
+        """
+        try:
+            st = self.ini_path.stat()
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    
+    def _ler_config(self):
+        """Lê o INI apenas se ele mudou desde a última leitura/gravação"""
+        stamp = self._stamp_arquivo()
+        if stamp is not None and stamp == self._config_stamp:
+            return
+        self.config.read(self.ini_path, encoding='utf-8')
+        self._config_stamp = stamp
+    
     def _salvar_config(self):
         """Salva configuração no arquivo INI"""
         try:
-            with open(self.ini_path, 'w', encoding='utf-8') as f:
-                self.config.write(f)
+            self._gravar_ini(self.config)
+            self._config_stamp = self._stamp_arquivo()
+        except Exception as e:
+            logger.error(f"Erro ao salvar configuração INI: {str(e)}")
+            raise
+    
+    def _gravar_ini(self, config: configparser.ConfigParser):
+        """Substitui o INI atomicamente preservando as permissões atuais"""
+        buffer = io.StringIO()
+        config.write(buffer)
+        permissoes = None
+        if self.ini_path.exists():
+            permissoes = stat.S_IMODE(self.ini_path.stat().st_mode)
+        escrever_arquivo_atomico(self.ini_path, buffer.getvalue(), permissoes)
+    
+    def ler_config_isolada(self) -> configparser.ConfigParser:
+        """Lê o INI em um ConfigParser próprio, sem tocar no compartilhado"""
+        config = configparser.ConfigParser()
+        config.read(self.ini_path, encoding='utf-8')
+        return config
+    
+    def salvar_config_isolada(self, config: configparser.ConfigParser):
+        """
+        Grava um ConfigParser próprio no INI
+        
+        Pode rodar fora da thread da interface: o parser compartilhado só
+        enxerga o novo conteúdo depois de recarregar() na thread da interface.
+        """
+        try:
+            self._gravar_ini(config)
         except Exception as e:
             logger.error(f"Erro ao salvar configuração INI: {str(e)}")
             raise
@@ -444,6 +567,7 @@ class ServidorManager:
         try:
             self.config.clear()
             self.config.read(self.ini_path, encoding='utf-8')
+            self._config_stamp = self._stamp_arquivo()
             logger.debug("Configuração recarregada do arquivo INI")
         except Exception as e:
             logger.error(f"Erro ao recarregar configuração: {str(e)}")
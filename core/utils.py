@@ -4,12 +4,26 @@ Funções utilitárias compartilhadas
 
 import os
 import re
+import sys
+import shutil
+import tempfile
+import functools
 import subprocess
 import logging
 from pathlib import Path
 from logging.handlers import RotatingFileHandler
 from typing import Optional
 
+try:
+    from PySide6.QtCore import QCoreApplication
+    from PySide6.QtDBus import (
+        QDBusArgument, QDBusConnection, QDBusMessage,
+        QDBusPendingCallWatcher, QDBusVariant
+    )
+except ImportError:
+    # Sem QtDBus: notificações caem direto no notify-send
+    QDBusConnection = None
+
 # --- Constantes ---
 LOG_LEVEL = logging.INFO
 LOG_MAX_SIZE = 5 * 1024 * 1024  # 5MB
@@ -39,6 +53,9 @@ QUALIDADE_MAP = {
     "Modem (menor)": "modem"
 }
 
+# Padrão de hostname/IP (letras, números, pontos, hífens)
+_HOST_PATTERN = re.compile(r'^[a-zA-Z0-9.-]+$')
+
 def setup_logging() -> logging.Logger:
     """Configura sistema de logging com rotação"""
     log_path = os.path.expanduser('~/.config/rdp-connector.log')
@@ -63,7 +80,9 @@ def get_log_path() -> str:
     return os.path.expanduser('~/.config/rdp-connector.log')
 
 def get_project_root() -> Path:
-    """Retorna diretório raiz do projeto"""
+    """Retorna diretório raiz do projeto (sys._MEIPASS no executável do PyInstaller)"""
+    if getattr(sys, 'frozen', False):
+        return Path(sys._MEIPASS)
     return Path(__file__).parent.parent
 
 def get_ini_path() -> Path:
@@ -86,15 +105,16 @@ def get_ini_path() -> Path:
     
     return config_file
 
+@functools.lru_cache(maxsize=32)
 def verificar_comando_disponivel(comando: str) -> bool:
-    """Verifica se um comando está disponível no sistema"""
+    """Verifica se um comando está disponível no sistema (resultado em cache)"""
     try:
-        subprocess.run([comando, "--help"], 
-                      stdout=subprocess.DEVNULL, 
+        subprocess.run([comando, "--help"],
+                      stdout=subprocess.DEVNULL,
                       stderr=subprocess.DEVNULL,
                       timeout=5)
         return True
-    except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
+    except (OSError, subprocess.TimeoutExpired):
         return False
 
 def validar_ip_porta(ip_porta: str) -> bool:
@@ -123,9 +143,7 @@ def validar_ip_porta(ip_porta: str) -> bool:
     
     # Validar hostname/IP (básico)
     # Aceita letras, números, pontos, hífens
-    import re
-    pattern = r'^[a-zA-Z0-9.-]+$'
-    if not re.match(pattern, host):
+    if not _HOST_PATTERN.match(host):
         return False
     
     # Não pode começar ou terminar com ponto ou hífen
@@ -156,9 +174,93 @@ def normalizar_ip_porta(ip_porta: str) -> str:
     # Adicionar porta padrão
     return f"{ip_porta}:3389"
 
+# Desativado após a primeira falha do serviço de notificações via DBus
+_dbus_notify_ok = True
+_dbus_notify_seq = 0
+_dbus_notify_watchers = set()
+
+def _icone_gicon(icon_name: str) -> "QDBusArgument":
+    """Ícone de tema serializado como GIcon: estrutura (sv) = ("themed", as)"""
+    icone = QDBusArgument()
+    icone.beginStructure()
+    icone.appendVariant("themed")
+    icone.appendVariant(QDBusVariant([icon_name]))
+    icone.endStructure()
+    return icone
+
+def _notificar_dbus(titulo: str, mensagem: str, icon_name: str) -> bool:
+    """
+    Envia notificação pelo portal org.freedesktop.portal.Notification
+    na conexão DBus de sessão do Qt (sem criar processo nem bloquear)
+    
+    Usa AddNotification(s, a{sv}) e não org.freedesktop.Notifications.Notify:
+    o PySide6 não consegue serializar o uint32 (replaces_id) exigido pelo
+    Notify, e o serviço rejeitaria a chamada pela assinatura.
+    
+    Returns:
+        True se a chamada foi enviada; se o serviço responder com erro, a
+        notificação segue pelo notify-send e o DBus deixa de ser usado
+    """
+    global _dbus_notify_ok, _dbus_notify_seq
+    app = QCoreApplication.instance() if QDBusConnection is not None else None
+    if not _dbus_notify_ok or app is None:
+        return False
+    
+    bus = QDBusConnection.sessionBus()
+    if not bus.isConnected():
+        _dbus_notify_ok = False
+        return False
+    
+    _dbus_notify_seq += 1
+    msg = QDBusMessage.createMethodCall(
+        "org.freedesktop.portal.Desktop",
+        "/org/freedesktop/portal/desktop",
+        "org.freedesktop.portal.Notification",
+        "AddNotification"
+    )
+    msg.setArguments([
+        f"freerdp-gui-{_dbus_notify_seq}",
+        {"title": titulo, "body": mensagem, "icon": _icone_gicon(icon_name)}
+    ])
+    
+    watcher = QDBusPendingCallWatcher(bus.asyncCall(msg), app)
+    _dbus_notify_watchers.add(watcher)
+    
+    def concluida(w):
+        global _dbus_notify_ok
+        _dbus_notify_watchers.discard(w)
+        w.deleteLater()
+        if w.isError():
+            logging.getLogger(__name__).debug(f"Notificação via DBus falhou: {w.error().message()}")
+            _dbus_notify_ok = False
+            _notificar_notify_send(titulo, mensagem, icon_name)
+    
+    watcher.finished.connect(concluida)
+    return True
+
+@functools.lru_cache(maxsize=1)
+def _caminho_notify_send() -> Optional[str]:
+    """Caminho do notify-send no PATH (procurado uma vez por processo)"""
+    return shutil.which("notify-send")
+
+def _notificar_notify_send(titulo: str, mensagem: str, icon_name: str) -> bool:
+    """Envia notificação com notify-send, sem esperar o processo terminar"""
+    notify_send = _caminho_notify_send()
+    if not notify_send:
+        return False
+    
+    try:
+        subprocess.Popen(
+            [notify_send, "-i", icon_name, titulo, mensagem],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        return True
+    except Exception:
+        return False
+
 def notificar_desktop(titulo: str, mensagem: str, icone: str = "information") -> bool:
     """
-    Envia notificação desktop usando notify-send
+    Envia notificação desktop via DBus (fallback: notify-send)
     
     Args:
         titulo: Título da notificação
@@ -168,20 +270,12 @@ def notificar_desktop(titulo: str, mensagem: str, icone: str = "information") ->
     Returns:
         True se notificação foi enviada com sucesso
     """
-    try:
-        if verificar_comando_disponivel("notify-send"):
-            icon_name = "krdc" if icone == "information" else "error"
-            subprocess.run([
-                "notify-send", 
-                "-i", icon_name,
-                titulo, 
-                mensagem
-            ], timeout=5)
-            return True
-    except Exception:
-        pass
+    icon_name = "krdc" if icone == "information" else "error"
+    
+    if _notificar_dbus(titulo, mensagem, icon_name):
+        return True
     
-    return False
+    return _notificar_notify_send(titulo, mensagem, icon_name)
 
 def expandir_usuario(caminho: str) -> str:
     """Expande ~ para diretório do usuário"""
@@ -212,6 +306,52 @@ def escrever_arquivo_texto(caminho: str, conteudo: str, encoding: str = 'utf-8')
     except Exception:
         return False
 
+def preparar_arquivo_atomico(caminho: Path, conteudo: str, permissoes: Optional[int] = None) -> Path:
+    """
+    Grava conteúdo em um temporário ao lado de caminho, já sincronizado no disco
+    
+    O destino só muda quando o temporário é entregue a substituir_arquivo,
+    então leitores nunca veem um arquivo truncado ou pela metade.
+    
+    Returns:
+        Caminho do arquivo temporário
+    """
+    caminho = Path(caminho)
+    fd, temporario = tempfile.mkstemp(dir=caminho.parent, prefix=f"{caminho.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())
+        if permissoes is not None:
+            os.chmod(temporario, permissoes)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+    return Path(temporario)
+
+def substituir_arquivo(temporario: Path, caminho: Path):
+    """Troca caminho pelo temporário de forma atômica e persiste a troca"""
+    caminho = Path(caminho)
+    os.replace(temporario, caminho)
+    try:
+        fd = os.open(caminho.parent, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+def escrever_arquivo_atomico(caminho: Path, conteudo: str, permissoes: Optional[int] = None):
+    """Substitui o conteúdo de caminho sem janela em que ele fique truncado"""
+    temporario = preparar_arquivo_atomico(caminho, conteudo, permissoes)
+    try:
+        substituir_arquivo(temporario, caminho)
+    except BaseException:
+        temporario.unlink(missing_ok=True)
+        raise
+
 def arquivo_existe(caminho: str) -> bool:
     """Verifica se arquivo existe"""
     return os.path.exists(caminho)
@@ -238,9 +238,7 @@ class GerenciadorServidoresWidget(QWidget):
     
     def _obter_senha_criptografada(self, nome: str) -> Optional[str]:
         """Obtém senha criptografada para o servidor"""
-        status = self.crypto_manager.get_status_info()
-        
-        if status['has_custom_password'] and not self.crypto_manager.is_unlocked():
+        if self.crypto_manager.has_custom_master_password() and not self.crypto_manager.is_unlocked():
             if self.servidor_manager.servidor_tem_senha_salva(nome):
                 return "[SENHA TRANCADA - Configure master password]"
             return None
@@ -262,8 +260,7 @@ class GerenciadorServidoresWidget(QWidget):
                 self.label_senha_salva.setText("🔒")
                 self.label_senha_salva.setToolTip("Senha salva mas trancada")
             else:
-                status = self.crypto_manager.get_status_info()
-                if status['has_custom_password']:
+                if self.crypto_manager.has_custom_master_password():
                     self.label_senha_salva.setText("🔐")
                     self.label_senha_salva.setToolTip("Senha criptografada (Master Password personalizada)")
                 else:
@@ -370,8 +367,7 @@ class GerenciadorServidoresWidget(QWidget):
         
         if senha and not senha.startswith("[SENHA TRANCADA"):
             if not self.servidor_manager.salvar_senha(nome, senha):
-                status = self.crypto_manager.get_status_info()
-                if status['has_custom_password'] and not self.crypto_manager.is_unlocked():
+                if self.crypto_manager.has_custom_master_password() and not self.crypto_manager.is_unlocked():
                     QMessageBox.warning(self, "Aviso", 
                                       f"Servidor salvo, mas senha não foi salva.\n"
                                       f"Desbloqueie as senhas para salvar a senha.")
@@ -398,8 +394,7 @@ class GerenciadorServidoresWidget(QWidget):
         
         if senha and not senha.startswith("[SENHA TRANCADA"):
             if not self.servidor_manager.salvar_senha(nome, senha):
-                status = self.crypto_manager.get_status_info()
-                if status['has_custom_password'] and not self.crypto_manager.is_unlocked():
+                if self.crypto_manager.has_custom_master_password() and not self.crypto_manager.is_unlocked():
                     QMessageBox.warning(self, "Aviso", "Desbloqueie as senhas para atualizar a senha")
                 else:
                     QMessageBox.warning(self, "Aviso", "Erro ao salvar senha criptografada")
@@ -419,8 +414,7 @@ class GerenciadorServidoresWidget(QWidget):
         
         self.servidores_atualizados.emit()
         
-        status = self.crypto_manager.get_status_info()
-        tipo_criptografia = "personalizada" if status['has_custom_password'] else "padrão"
+        tipo_criptografia = "personalizada" if self.crypto_manager.has_custom_master_password() else "padrão"
         
         QMessageBox.information(self, "Sucesso", 
                               f"✅ Servidor '{nome}' {acao} com sucesso!\n\n"
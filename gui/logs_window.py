@@ -10,12 +10,12 @@ try:
         QDialog, QVBoxLayout, QHBoxLayout,
         QTextEdit, QPushButton, QMessageBox
     )
-    from PySide6.QtCore import QTimer
-    from PySide6.QtGui import QFont, QIcon
+    from PySide6.QtCore import QTimer, QFileSystemWatcher
+    from PySide6.QtGui import QFont
 except ImportError as e:
     raise ImportError(f"PySide6 não encontrado: {e}")
 
-from core.utils import get_log_path, ler_arquivo_texto, arquivo_existe, get_project_root
+from core.utils import get_log_path, ler_arquivo_texto, arquivo_existe
 
 logger = logging.getLogger(__name__)
 
@@ -26,32 +26,26 @@ class LogsWindow(QDialog):
         super().__init__(parent)
         
         self.log_path = get_log_path()
+        self.log_dir = str(Path(self.log_path).parent)
         self.last_content = ""
         
+        # Atualização automática guiada por mudanças no arquivo (sem polling);
+        # rajadas de escrita no log viram uma única releitura
+        self.update_timer = QTimer(self)
+        self.update_timer.setSingleShot(True)
+        self.update_timer.setInterval(200)
+        self.update_timer.timeout.connect(self._load_logs)
+        
+        self.log_watcher = QFileSystemWatcher(self)
+        self.log_watcher.fileChanged.connect(self._on_log_changed)
+        self.log_watcher.directoryChanged.connect(self._on_log_dir_changed)
+        
         self._init_ui()
         self._load_logs()
-        
-        # Timer para atualização automática
-        self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self._load_logs)
-        self.update_timer.start(2000)  # Atualizar a cada 2 segundos
     
     def _init_ui(self):
         """Inicializa interface do usuário"""
         self.setWindowTitle("Logs - RDP Connector Pro")
-        # Definir ícone da janela de logs usando assets com fallback
-        try:
-            icon_path = get_project_root() / "assets" / "rdp-icon.png"
-            if arquivo_existe(str(icon_path)):
-                icon = QIcon(str(icon_path))
-                if not icon.isNull():
-                    self.setWindowIcon(icon)
-            else:
-                theme_icon = QIcon.fromTheme("krdc")
-                if not theme_icon.isNull():
-                    self.setWindowIcon(theme_icon)
-        except Exception:
-            pass
         self.setModal(False)  # Permitir interação com janela principal
         self.resize(800, 600)
         
@@ -143,6 +137,33 @@ class LogsWindow(QDialog):
             logger.exception("Erro ao carregar logs")
             self.log_text.setPlainText(f"Erro ao carregar logs: {str(e)}")
     
+    def _watch_log(self):
+        """
+        Passa a observar o arquivo de log e o diretório dele
+        
+        O diretório avisa quando o arquivo é criado ou recriado após uma
+        rotação, já que só arquivos existentes podem ser observados.
+        """
+        if self.log_dir not in self.log_watcher.directories() and arquivo_existe(self.log_dir):
+            self.log_watcher.addPath(self.log_dir)
+        if self.log_path not in self.log_watcher.files() and arquivo_existe(self.log_path):
+            self.log_watcher.addPath(self.log_path)
+    
+    def _on_log_changed(self, path):
+        """Arquivo de log alterado: agenda releitura"""
+        # Rotação/truncamento pode remover o caminho do watcher: observar de novo
+        self._watch_log()
+        self.update_timer.start()
+    
+    def _on_log_dir_changed(self, path):
+        """Diretório do log alterado: retoma o arquivo se ele (re)apareceu"""
+        # Com o arquivo já observado, fileChanged cobre as escritas
+        if self.log_path in self.log_watcher.files():
+            return
+        self._watch_log()
+        if self.log_path in self.log_watcher.files():
+            self.update_timer.start()
+    
     def _clear_logs(self):
         """Limpa arquivo de log"""
         resposta = QMessageBox.question(
@@ -207,9 +228,8 @@ class LogsWindow(QDialog):
     
     def closeEvent(self, event):
         """Evento de fechamento da janela"""
-        # Parar timer de atualização
-        if hasattr(self, 'update_timer'):
-            self.update_timer.stop()
+        # Parar atualizações automáticas
+        self._stop_watching()
         
         # Aceitar fechamento
         event.accept()
@@ -218,7 +238,21 @@ class LogsWindow(QDialog):
         """Evento de exibição da janela"""
         # Carregar logs quando janela for mostrada
         self._load_logs()
+        self._watch_log()
         super().showEvent(event)
+    
+    def hideEvent(self, event):
+        """Evento de ocultação da janela"""
+        # Janela oculta (fechada, Esc ou app no tray): sem atualizações automáticas
+        self._stop_watching()
+        super().hideEvent(event)
+    
+    def _stop_watching(self):
+        """Deixa de observar o arquivo de log e o diretório dele"""
+        self.update_timer.stop()
+        observados = self.log_watcher.files() + self.log_watcher.directories()
+        if observados:
+            self.log_watcher.removePaths(observados)
 
 class LogViewer:
     """Classe utilitária para visualização de logs"""
@@ -4,6 +4,7 @@ Janela principal da aplicação FreeRDP-GUI com master password opcional
 
 import logging
 import subprocess
+from collections import namedtuple
 from typing import Dict, Tuple, Optional
 
 try:
@@ -12,8 +13,10 @@ try:
         QLabel, QComboBox, QLineEdit, QPushButton, QCheckBox, QMessageBox,
         QFormLayout, QSystemTrayIcon, QMenu, QTabWidget, QApplication
     )
-    from PySide6.QtCore import Qt, QTimer, Signal
-    from PySide6.QtGui import QIcon, QPixmap, QAction
+    from PySide6.QtCore import (
+        Qt, QTimer, Signal, Slot, QEvent, QObject, QRunnable, QThreadPool
+    )
+    from PySide6.QtGui import QPixmap, QAction
 except ImportError as e:
     raise ImportError(f"PySide6 não encontrado: {e}")
 
@@ -23,8 +26,7 @@ from core.rdp import RDPThread, criar_opcoes_padrao
 from core.utils import (
     SOM_MAP, RESOLUCAO_MAP, QUALIDADE_MAP,
     notificar_desktop, verificar_comando_disponivel,
-    validar_ip_porta, normalizar_ip_porta,
-    get_project_root, arquivo_existe
+    validar_ip_porta, normalizar_ip_porta
 )
 from core.crypto import get_crypto_manager
 
@@ -35,6 +37,82 @@ from .master_password_dialog import solicitar_master_password, alterar_master_pa
 
 logger = logging.getLogger(__name__)
 
+# Itens exibidos nos combos de opções (mesma ordem dos mapas)
+_SOM_ITEMS = tuple(SOM_MAP)
+_RESOLUCAO_ITEMS = tuple(RESOLUCAO_MAP)
+_QUALIDADE_ITEMS = tuple(QUALIDADE_MAP)
+
+# Resultado da busca de senha salva: state é 'ok', 'locked' ou 'missing'
+PasswordResult = namedtuple('PasswordResult', 'state value')
+
+_TEXTO_SENHA_TRANCADA = "[SENHA TRANCADA - Clique em Senhas > Destrancar]"
+
+# Enums Qt usados nos eventos da janela e diálogos
+_BTN_YES = QMessageBox.StandardButton.Yes
+_BTN_NO = QMessageBox.StandardButton.No
+_BTN_YN = _BTN_YES | _BTN_NO
+_WIN_MIN = Qt.WindowState.WindowMinimized
+_EVT_WINDOW_STATE_CHANGE = QEvent.Type.WindowStateChange
+# Emissor e receptor na thread da GUI: dispensa a checagem de afinidade da AutoConnection
+_DIRECT = Qt.ConnectionType.DirectConnection
+
+class _SenhaLoaderSignals(QObject):
+    """Sinais do carregador de senha (QRunnable não é QObject)"""
+    
+    concluido = Signal(int, str, str)  # (geração, servidor, senha ou "")
+
+class _SenhaLoader(QRunnable):
+    """Descriptografa a senha salva de um servidor fora da thread da interface"""
+    
+    def __init__(self, servidor_manager, nome_servidor: str, geracao: int):
+        super().__init__()
+        self.servidor_manager = servidor_manager
+        self.nome_servidor = nome_servidor
+        self.geracao = geracao
+        self.signals = _SenhaLoaderSignals()
+    
+    def run(self):
+        senha = self.servidor_manager.obter_senha_isolada(self.nome_servidor)
+        self.signals.concluido.emit(self.geracao, self.nome_servidor, senha or "")
+
+def _detectar_freerdp(ignorar_cache: bool = False) -> bool:
+    """
+    Procura o FreeRDP no sistema (xfreerdp3/xfreerdp/freerdp) e depois no Flathub
+    
+    Args:
+        ignorar_cache: Limpa o cache de verificar_comando_disponivel antes de
+            consultar os comandos
+    """
+    if ignorar_cache:
+        verificar_comando_disponivel.cache_clear()
+    for cmd in ("xfreerdp3", "xfreerdp", "freerdp"):
+        if verificar_comando_disponivel(cmd):
+            return True
+    try:
+        result = subprocess.run(
+            ["flatpak", "run", "com.freerdp.FreeRDP", "/help"],
+            capture_output=True, timeout=5
+        )
+        return result.returncode != 127
+    except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError):
+        return False
+
+class _FreeRDPCheckSignals(QObject):
+    """Sinais da verificação do FreeRDP (QRunnable não é QObject)"""
+    
+    concluido = Signal(bool)  # FreeRDP disponível
+
+class _FreeRDPCheck(QRunnable):
+    """Verifica a presença do FreeRDP fora da thread da interface"""
+    
+    def __init__(self, ignorar_cache: bool = False):
+        super().__init__()
+        self.ignorar_cache = ignorar_cache
+        self.signals = _FreeRDPCheckSignals()
+    
+    def run(self):
+        self.signals.concluido.emit(_detectar_freerdp(self.ignorar_cache))
+
 class FreeRDPGUIWindow(QMainWindow):
     """Janela principal da aplicação"""
     
@@ -44,9 +122,7 @@ class FreeRDPGUIWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self._fechar_de_verdade = False
-        
-        # Contador de conexões ativas
-        self.conexoes_ativas = 0
+        self.system_tray: Optional[SystemTrayManager] = None
 
         # Managers
         self.servidor_manager = get_servidor_manager()
@@ -55,8 +131,39 @@ class FreeRDPGUIWindow(QMainWindow):
         self.crypto_manager = get_crypto_manager()
         
         # Estado
-        self.rdp_threads: Dict[str, RDPThread] = {}
+        # Threads ativas por id (propriedade "slot" da thread). Os ids só
+        # crescem: um conexao_finalizada atrasado nunca acerta outra thread
+        self.rdp_threads: Dict[int, RDPThread] = {}
+        self._next_thread_slot = 0
         self.logs_window = None
+        self._opcoes_cache: Optional[Dict] = None
+        
+        # Valores selecionados nos combos, atualizados por currentIndexChanged
+        self._opt_som = 'local'
+        self._opt_resolucao = 'auto'
+        self._opt_qualidade = 'broadband'
+        
+        # Senhas já descriptografadas nesta sessão (servidor -> senha)
+        self._senhas_cache: Dict[str, str] = {}
+        # Incrementada a cada nova busca, troca de lista ou trava: resultados
+        # de _SenhaLoader com geração antiga são descartados
+        self._senha_geracao = 0
+        
+        # Resultado da detecção do FreeRDP (None enquanto verifica); só uma
+        # ação do usuário ("Verificar novamente") dispara nova verificação
+        self._freerdp_disponivel: Optional[bool] = None
+        
+        # Última configuração gravada (evita reescrever conteúdo idêntico)
+        self._last_saved_config: Optional[Dict] = None
+        
+        # Threads RDP aguardando encerramento assíncrono
+        self._pending_shutdowns: set = set()  # slots
+        
+        # Gravação das configurações agrupada (debounce de 500ms)
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.setInterval(500)
+        self._save_timer.timeout.connect(self._do_save_configuracoes)
         
         # Dados
         self.servidores = {}
@@ -86,84 +193,124 @@ class FreeRDPGUIWindow(QMainWindow):
                 "<i>💡 Dica: A master password permite trancar/destrancar as senhas quando quiser</i>"
             )
     
-    def incrementar_conexoes(self):
-        """Incrementa contador de conexões ativas"""
-        self.conexoes_ativas += 1
-        logger.info(f"Conexões ativas: {self.conexoes_ativas}")
-        
-    def decrementar_conexoes(self):
-        """Decrementa contador de conexões ativas"""
-        self.conexoes_ativas = max(0, self.conexoes_ativas - 1)
-        logger.info(f"Conexões ativas: {self.conexoes_ativas}")
-    
+    @Slot()
     def verificar_saida_completa(self):
         """Verifica se a aplicação deve sair completamente"""
         return
     
+    @Slot()
     def considerar_saida(self):
         """Considera sair se ainda não há atividade"""
         return
     
+    @Slot()
     def sair_aplicacao(self):
         """Método para sair completamente da aplicação"""
         logger.info("Saindo da aplicação completamente")
         
-        self.encerrar_todas_conexoes()
-        self._salvar_configuracoes()
-        
         self._fechar_de_verdade = True
-        self.aplicacao_deve_sair.emit()
+        self._do_save_configuracoes()
+        
+        # Sem threads pendentes sai já; senão _concluir_encerramento emite depois
+        if self.encerrar_todas_conexoes():
+            self.aplicacao_deve_sair.emit()
     
-    def encerrar_todas_conexoes(self):
-        """Encerra todas as conexões RDP ativas"""
+    def encerrar_todas_conexoes(self) -> bool:
+        """
+        Encerra todas as conexões RDP ativas
+        
+        Returns:
+            True se não restou nenhuma thread aguardando encerramento
+        """
         logger.info("Encerrando todas as conexões RDP")
-        self._limpar_thread_rdp()
-        self.conexoes_ativas = 0
+        return self._limpar_thread_rdp()
     
-    def _limpar_thread_rdp(self):
-        """Limpa todas as threads RDP de forma segura"""
-        if not self.rdp_threads:
+    def _limpar_thread_rdp(self) -> bool:
+        """
+        Solicita o encerramento de todas as threads RDP sem bloquear a interface
+        
+        Returns:
+            True se todas já estavam finalizadas; False se há encerramentos
+            pendentes (concluídos em _on_thread_encerrada)
+        """
+        ativas = self._conexoes_ativas()
+        if not ativas:
             return True
 
-        logger.info(f"Finalizando {len(self.rdp_threads)} threads RDP...")
-
-        threads_a_remover = list(self.rdp_threads.keys())
-        for thread_id in threads_a_remover:
-            thread = self.rdp_threads.get(thread_id)
-            if thread and thread.isRunning():
-                logger.info(f"Finalizando thread {thread_id}...")
-                thread.quit()
-                if not thread.wait(3000):
-                    logger.warning(f"Thread {thread_id} não finalizou graciosamente, forçando...")
-                    thread.terminate()
-                    if not thread.wait(2000):
-                        logger.error(f"Thread {thread_id} não pôde ser finalizada!")
-                        continue
-
-            if thread:
+        logger.info(f"Finalizando {ativas} threads RDP...")
+
+        for slot, thread in list(self.rdp_threads.items()):
+            if slot in self._pending_shutdowns:
+                continue
+            if thread.isRunning():
+                logger.info(f"Finalizando thread {thread.objectName()}...")
+                self._pending_shutdowns.add(slot)
+                thread.conexao_finalizada.connect(self._on_thread_encerrada)
+                thread.parar()
+            else:
                 thread.deleteLater()
+                self._liberar_slot(slot)
+
+        if not self._pending_shutdowns:
+            logger.info("Todas as threads RDP finalizadas com sucesso")
+            return True
+
+        # Escalonamento: FreeRDP que não sair com SIGTERM em 3s leva SIGKILL
+        QTimer.singleShot(3000, self._force_terminate_stragglers)
+        return False
+
+    @Slot(bool, str)
+    def _on_thread_encerrada(self, sucesso: bool, mensagem: str):
+        """Chamado quando uma thread com encerramento pendente finaliza"""
+        slot = self.sender().property("slot")
+        if slot not in self._pending_shutdowns:
+            return
+        self._pending_shutdowns.discard(slot)
+        self._liberar_slot(slot)
+        if not self._pending_shutdowns:
+            self._concluir_encerramento()
+
+    @Slot()
+    def _force_terminate_stragglers(self):
+        """Mata o FreeRDP das threads que não encerraram graciosamente"""
+        if not self._pending_shutdowns:
+            return
+
+        for slot in self._pending_shutdowns:
+            thread = self.rdp_threads.get(slot)
+            if thread is not None:
+                logger.warning(f"Thread {thread.objectName()} não finalizou graciosamente, forçando...")
+                thread.parar(forcar=True)
+
+        # Sem wait(): a thread sai assim que o processo morre e
+        # _on_thread_encerrada libera o slot
+        QTimer.singleShot(2000, self._avisar_threads_presas)
 
-            if thread_id in self.rdp_threads:
-                del self.rdp_threads[thread_id]
+    @Slot()
+    def _avisar_threads_presas(self):
+        """Registra threads que nem o SIGKILL conseguiu encerrar"""
+        for slot in self._pending_shutdowns:
+            thread = self.rdp_threads.get(slot)
+            if thread is not None:
+                logger.error(f"Thread {thread.objectName()} não pôde ser finalizada!")
 
+    def _conexoes_ativas(self) -> int:
+        """Número de threads RDP ativas"""
+        return len(self.rdp_threads)
+
+    def _liberar_slot(self, slot: int):
+        """Libera o id de uma thread (ids já liberados são ignorados)"""
+        self.rdp_threads.pop(slot, None)
+
+    def _concluir_encerramento(self):
+        """Finaliza a saída após o encerramento de todas as threads"""
         logger.info("Todas as threads RDP finalizadas com sucesso")
-        return True
+        if self._fechar_de_verdade:
+            self.aplicacao_deve_sair.emit()
 
     def _init_ui(self):
         """Inicializa interface do usuário"""
         self.setWindowTitle("FreeRDP-GUI")
-        try:
-            icon_path = get_project_root() / "assets" / "rdp-icon.png"
-            if arquivo_existe(str(icon_path)):
-                icon = QIcon(str(icon_path))
-                if not icon.isNull():
-                    self.setWindowIcon(icon)
-            else:
-                theme_icon = QIcon.fromTheme("krdc")
-                if not theme_icon.isNull():
-                    self.setWindowIcon(theme_icon)
-        except Exception:
-            pass
         self.setFixedSize(500, 650)
         
         central_widget = QWidget()
@@ -178,6 +325,41 @@ class FreeRDPGUIWindow(QMainWindow):
         self._init_aba_servidores()
         self._init_botoes_principais(layout)
         self._init_menu_senhas()
+        self._conectar_invalidacao_opcoes()
+    
+    def _conectar_invalidacao_opcoes(self):
+        """Invalida o cache de opções sempre que um widget da aba Opções muda"""
+        checks = (
+            self.check_clipboard, self.check_home, self.check_impressoras,
+            self.check_multimonitor, self.check_ignorar_cert,
+            self.check_sec_rdp, self.check_sec_tls, self.check_sec_nla,
+            self.check_sec_ext, self.check_sec_aad
+        )
+        for check in checks:
+            check.stateChanged.connect(self._invalidar_opcoes, _DIRECT)
+    
+    @Slot()
+    def _invalidar_opcoes(self):
+        """Descarta as opções de conexão em cache"""
+        self._opcoes_cache = None
+    
+    @Slot(int)
+    def _on_som_changed(self, indice: int):
+        """Atualiza valor de som selecionado"""
+        self._opt_som = SOM_MAP[_SOM_ITEMS[indice]] if indice >= 0 else 'local'
+        self._opcoes_cache = None
+    
+    @Slot(int)
+    def _on_resolucao_changed(self, indice: int):
+        """Atualiza valor de resolução selecionado"""
+        self._opt_resolucao = RESOLUCAO_MAP[_RESOLUCAO_ITEMS[indice]] if indice >= 0 else 'auto'
+        self._opcoes_cache = None
+    
+    @Slot(int)
+    def _on_qualidade_changed(self, indice: int):
+        """Atualiza valor de qualidade selecionado"""
+        self._opt_qualidade = QUALIDADE_MAP[_QUALIDADE_ITEMS[indice]] if indice >= 0 else 'broadband'
+        self._opcoes_cache = None
     
     def _init_menu_senhas(self):
         """Inicializa menu para gerenciamento de senhas"""
@@ -186,27 +368,27 @@ class FreeRDPGUIWindow(QMainWindow):
         senha_menu = menubar.addMenu("&Senhas")
         
         config_action = QAction("&Configurar Master Password...", self)
-        config_action.triggered.connect(self._configurar_master_password)
+        config_action.triggered.connect(self._configurar_master_password, _DIRECT)
         senha_menu.addAction(config_action)
         
         change_action = QAction("&Alterar Master Password...", self)
-        change_action.triggered.connect(self._alterar_master_password)
+        change_action.triggered.connect(self._alterar_master_password, _DIRECT)
         senha_menu.addAction(change_action)
         
         remove_action = QAction("&Remover Master Password", self)
-        remove_action.triggered.connect(self._remover_master_password)
+        remove_action.triggered.connect(self._remover_master_password, _DIRECT)
         senha_menu.addAction(remove_action)
         
         senha_menu.addSeparator()
         
         self.lock_action = QAction("&Trancar Senhas", self)
-        self.lock_action.triggered.connect(self._toggle_crypto_lock)
+        self.lock_action.triggered.connect(self._toggle_crypto_lock, _DIRECT)
         senha_menu.addAction(self.lock_action)
         
         senha_menu.addSeparator()
         
         status_action = QAction("&Status do Sistema...", self)
-        status_action.triggered.connect(self._mostrar_status_senhas)
+        status_action.triggered.connect(self._mostrar_status_senhas, _DIRECT)
         senha_menu.addAction(status_action)
         
         self._atualizar_menu_senhas()
@@ -223,6 +405,7 @@ class FreeRDPGUIWindow(QMainWindow):
             else:
                 self.lock_action.setText("&Destrancar Senhas")
     
+    @Slot()
     def _configurar_master_password(self):
         """Configura master password pela primeira vez"""
         status = self.crypto_manager.get_status_info()
@@ -231,9 +414,9 @@ class FreeRDPGUIWindow(QMainWindow):
             resposta = QMessageBox.question(
                 self, "Master Password", 
                 "Master password já está configurada.\n\nDeseja alterá-la?",
-                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+                _BTN_YN
             )
-            if resposta == QMessageBox.StandardButton.Yes:
+            if resposta == _BTN_YES:
                 self._alterar_master_password()
             return
         
@@ -248,15 +431,14 @@ class FreeRDPGUIWindow(QMainWindow):
             "• Segurança adicional<br/><br/>"
             "⚠️ <b>Importante:</b> Se esquecer a master password, perderá acesso às senhas!<br/><br/>"
             "Deseja configurar uma master password personalizada?",
-            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
-            QMessageBox.StandardButton.No
+            _BTN_YN,
+            _BTN_NO
         )
         
-        if resposta != QMessageBox.StandardButton.Yes:
+        if resposta != _BTN_YES:
             return
         
-        senha = solicitar_master_password(self, is_first_time=True)
-        if senha:
+        if solicitar_master_password(self, is_first_time=True):
             QMessageBox.information(
                 self, "Sucesso", 
                 "✅ <b>Master Password configurada!</b><br/><br/>"
@@ -267,6 +449,7 @@ class FreeRDPGUIWindow(QMainWindow):
             self._atualizar_menu_senhas()
             self._on_servidor_changed(self.combo_servidor.currentText())
     
+    @Slot()
     def _alterar_master_password(self):
         """Altera master password existente"""
         status = self.crypto_manager.get_status_info()
@@ -289,6 +472,7 @@ class FreeRDPGUIWindow(QMainWindow):
         if alterar_master_password(self):
             self._atualizar_menu_senhas()
     
+    @Slot()
     def _remover_master_password(self):
         """Remove master password e volta para chave padrão"""
         status = self.crypto_manager.get_status_info()
@@ -310,11 +494,11 @@ class FreeRDPGUIWindow(QMainWindow):
             "• Re-criptografar todas as senhas existentes<br/><br/>"
             "<b>Suas senhas continuarão seguras</b> (criptografadas com chave padrão)<br/><br/>"
             "Tem certeza que deseja continuar?",
-            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
-            QMessageBox.StandardButton.No
+            _BTN_YN,
+            _BTN_NO
         )
         
-        if resposta != QMessageBox.StandardButton.Yes:
+        if resposta != _BTN_YES:
             return
         
         if self.crypto_manager.remove_master_password():
@@ -333,6 +517,7 @@ class FreeRDPGUIWindow(QMainWindow):
                 "Erro ao remover master password.\nVerifique os logs para mais detalhes."
             )
     
+    @Slot()
     def _toggle_crypto_lock(self):
         """Alterna trava do crypto (só se tem master password personalizada)"""
         status = self.crypto_manager.get_status_info()
@@ -347,11 +532,12 @@ class FreeRDPGUIWindow(QMainWindow):
         
         if self.crypto_manager.is_unlocked():
             self.crypto_manager.lock()
+            self._senhas_cache.clear()
+            self._senha_geracao += 1
             self._notificar("FreeRDP-GUI", "Senhas trancadas")
             self._limpar_senhas_interface()
         else:
-            senha = solicitar_master_password(self)
-            if senha:
+            if solicitar_master_password(self):
                 self._notificar("FreeRDP-GUI", "Senhas destrancadas")
                 self._on_servidor_changed(self.combo_servidor.currentText())
         
@@ -359,12 +545,13 @@ class FreeRDPGUIWindow(QMainWindow):
     
     def _limpar_senhas_interface(self):
         """Limpa senhas da interface quando trancado"""
-        if self.edit_senha.text() and self.edit_senha.text().startswith("[SENHA TRANCADA"):
+        if self.edit_senha.text() == _TEXTO_SENHA_TRANCADA:
             return
         
         self.edit_senha.clear()
         self._atualizar_indicador_senha_salva(False)
     
+    @Slot()
     def _mostrar_status_senhas(self):
         """Mostra status detalhado do sistema de senhas"""
         status = self.crypto_manager.get_status_info()
@@ -403,7 +590,7 @@ class FreeRDPGUIWindow(QMainWindow):
         servidor_layout = QFormLayout()
         
         self.combo_servidor = QComboBox()
-        self.combo_servidor.currentTextChanged.connect(self._on_servidor_changed)
+        self.combo_servidor.currentTextChanged.connect(self._on_servidor_changed, _DIRECT)
         servidor_layout.addRow("Servidor:", self.combo_servidor)
         
         self.edit_ip_manual = QLineEdit()
@@ -460,7 +647,8 @@ class FreeRDPGUIWindow(QMainWindow):
         
         som_layout = QFormLayout()
         self.combo_som = QComboBox()
-        self.combo_som.addItems(list(SOM_MAP.keys()))
+        self.combo_som.currentIndexChanged.connect(self._on_som_changed, _DIRECT)
+        self.combo_som.addItems(_SOM_ITEMS)
         som_layout.addRow("Som:", self.combo_som)
         layout.addLayout(som_layout)
         
@@ -477,11 +665,13 @@ class FreeRDPGUIWindow(QMainWindow):
         parent_layout.addWidget(self.check_multimonitor)
         
         self.combo_resolucao = QComboBox()
-        self.combo_resolucao.addItems(list(RESOLUCAO_MAP.keys()))
+        self.combo_resolucao.currentIndexChanged.connect(self._on_resolucao_changed, _DIRECT)
+        self.combo_resolucao.addItems(_RESOLUCAO_ITEMS)
         display_layout.addRow("Resolução:", self.combo_resolucao)
         
         self.combo_qualidade = QComboBox()
-        self.combo_qualidade.addItems(list(QUALIDADE_MAP.keys()))
+        self.combo_qualidade.currentIndexChanged.connect(self._on_qualidade_changed, _DIRECT)
+        self.combo_qualidade.addItems(_QUALIDADE_ITEMS)
         self.combo_qualidade.setCurrentText("Broadband")
         display_layout.addRow("Qualidade:", self.combo_qualidade)
         
@@ -526,27 +716,39 @@ class FreeRDPGUIWindow(QMainWindow):
         parent_layout.addLayout(seguranca_layout)
     
     def _init_aba_servidores(self):
-        """Inicializa aba de gerenciamento de servidores"""
+        """Inicializa aba de gerenciamento de servidores (conteúdo criado no primeiro acesso)"""
         self.tab_servidores = QWidget()
         self.tabs.addTab(self.tab_servidores, "Gerenciar Servidores")
         
-        layout = QVBoxLayout(self.tab_servidores)
+        QVBoxLayout(self.tab_servidores)
+        
+        self.gerenciador_servidores = None
+        self.tabs.currentChanged.connect(self._maybe_init_tab, _DIRECT)
+    
+    @Slot(int)
+    def _maybe_init_tab(self, indice: int):
+        """Cria o gerenciador de servidores na primeira vez que a aba é exibida"""
+        if self.gerenciador_servidores is not None:
+            return
+        if self.tabs.widget(indice) is not self.tab_servidores:
+            return
         
         self.gerenciador_servidores = GerenciadorServidoresWidget()
-        self.gerenciador_servidores.servidores_atualizados.connect(self._carregar_servidores)
-        layout.addWidget(self.gerenciador_servidores)
+        self.gerenciador_servidores.servidores_atualizados.connect(self._carregar_servidores, _DIRECT)
+        self.tab_servidores.layout().addWidget(self.gerenciador_servidores)
+        self.tabs.currentChanged.disconnect(self._maybe_init_tab)
     
     def _init_botoes_principais(self, parent_layout):
         """Inicializa botões principais"""
         button_layout = QHBoxLayout()
         
         self.btn_conectar = QPushButton("Conectar")
-        self.btn_conectar.clicked.connect(self._conectar)
+        self.btn_conectar.clicked.connect(self._conectar, _DIRECT)
         self.btn_conectar.setDefault(True)
         button_layout.addWidget(self.btn_conectar)
         
         btn_cancelar = QPushButton("Fechar")
-        btn_cancelar.clicked.connect(self._ocultar_janela)
+        btn_cancelar.clicked.connect(self._ocultar_janela, _DIRECT)
         button_layout.addWidget(btn_cancelar)
         
         parent_layout.addLayout(button_layout)
@@ -555,26 +757,44 @@ class FreeRDPGUIWindow(QMainWindow):
         """Inicializa gerenciador do system tray"""
         self.system_tray = SystemTrayManager(self)
         self.system_tray.conectar_sinais_janela_principal(self)
+        if not self.system_tray.is_available():
+            # Aviso não modal, exibido quando o loop de eventos já estiver rodando
+            QTimer.singleShot(0, self._avisar_tray_indisponivel)
+    
+    @Slot()
+    def _avisar_tray_indisponivel(self):
+        """Avisa na barra de status que fechar a janela encerra o aplicativo"""
+        self.statusBar().showMessage(
+            "Bandeja do sistema indisponível: fechar a janela encerra o aplicativo", 5000
+        )
     
+    @Slot()
     def _carregar_servidores(self):
         """Carrega servidores do gerenciador e atualiza interface"""
         self.servidores = self.servidor_manager.carregar_servidores()
+        self._senhas_cache.clear()
         
         servidor_atual = self.combo_servidor.currentText()
         
+        # Repopular sem sinais: um único _on_servidor_changed no final
+        self.combo_servidor.blockSignals(True)
         self.combo_servidor.clear()
         self.combo_servidor.addItems(list(self.servidores.keys()))
         
         if servidor_atual in self.servidores:
             self.combo_servidor.setCurrentText(servidor_atual)
+        self.combo_servidor.blockSignals(False)
+        self._on_servidor_changed(self.combo_servidor.currentText())
         
-        if hasattr(self, 'system_tray'):
+        if self.system_tray is not None:
             self.system_tray.atualizar_menu_servidores(self.servidores)
         
         logger.info(f"Carregados {len(self.servidores)} servidores")
     
+    @Slot(str)
     def _on_servidor_changed(self, servidor_nome: str):
         """Chamado quando servidor é alterado no combo"""
+        self._senha_geracao += 1
         if servidor_nome == "Manual":
             self.edit_ip_manual.setVisible(True)
             self.edit_usuario.setText("usuario")
@@ -587,13 +807,40 @@ class FreeRDPGUIWindow(QMainWindow):
                 _, usuario_padrao = self.servidores[servidor_nome]
                 self.edit_usuario.setText(usuario_padrao)
                 
-                senha_salva = self._obter_senha_criptografada(servidor_nome)
-                if senha_salva:
-                    self.edit_senha.setText(senha_salva)
-                    self._atualizar_indicador_senha_salva(True, senha_salva.startswith("[SENHA TRANCADA"))
+                # Cache ou senhas trancadas: resposta imediata, sem descriptografar
+                if servidor_nome in self._senhas_cache or not self.crypto_manager.is_unlocked():
+                    self._aplicar_resultado_senha(self._obter_senha_criptografada(servidor_nome))
                 else:
-                    self.edit_senha.setText("")
-                    self._atualizar_indicador_senha_salva(False)
+                    self._aplicar_resultado_senha(PasswordResult('missing', None))
+                    loader = _SenhaLoader(self.servidor_manager, servidor_nome, self._senha_geracao)
+                    loader.signals.concluido.connect(self._on_senha_carregada)
+                    QThreadPool.globalInstance().start(loader)
+    
+    @Slot(int, str, str)
+    def _on_senha_carregada(self, geracao: int, servidor_nome: str, senha: str):
+        """Recebe senha carregada em segundo plano"""
+        # Descartar resultado de uma seleção que já mudou ou de antes da trava
+        if geracao != self._senha_geracao or not self.crypto_manager.is_unlocked():
+            return
+        
+        if senha:
+            self._senhas_cache[servidor_nome] = senha
+            # Usuário já digitou no campo desde que ele foi limpo
+            if self.edit_senha.isModified():
+                return
+            self._aplicar_resultado_senha(PasswordResult('ok', senha))
+    
+    def _aplicar_resultado_senha(self, resultado: PasswordResult):
+        """Preenche campo e indicador de senha conforme resultado da busca"""
+        if resultado.state == 'ok':
+            self.edit_senha.setText(resultado.value)
+            self._atualizar_indicador_senha_salva(True)
+        elif resultado.state == 'locked':
+            self.edit_senha.setText(_TEXTO_SENHA_TRANCADA)
+            self._atualizar_indicador_senha_salva(True, True)
+        else:
+            self.edit_senha.setText("")
+            self._atualizar_indicador_senha_salva(False)
     
     def _atualizar_indicador_senha_salva(self, tem_senha_salva: bool, esta_trancada: bool = False):
         """Atualiza indicador visual de senha salva"""
@@ -602,8 +849,7 @@ class FreeRDPGUIWindow(QMainWindow):
                 self.label_senha_salva.setText("🔒")
                 self.label_senha_salva.setToolTip("Senha salva mas trancada - desbloqueie no menu Senhas")
             else:
-                status = self.crypto_manager.get_status_info()
-                if status['has_custom_password']:
+                if self.crypto_manager.has_custom_master_password():
                     self.label_senha_salva.setText("🔐")
                     self.label_senha_salva.setToolTip("Senha criptografada (Master Password personalizada)")
                 else:
@@ -613,24 +859,27 @@ class FreeRDPGUIWindow(QMainWindow):
         else:
             self.label_senha_salva.setVisible(False)
     
-    def _obter_senha_criptografada(self, nome_servidor: str) -> Optional[str]:
+    def _obter_senha_criptografada(self, nome_servidor: str) -> PasswordResult:
         """Obtém senha criptografada para o servidor"""
-        status = self.crypto_manager.get_status_info()
-        
-        if status['has_custom_password'] and not self.crypto_manager.is_unlocked():
+        if self.crypto_manager.has_custom_master_password() and not self.crypto_manager.is_unlocked():
             if self.servidor_manager.servidor_tem_senha_salva(nome_servidor):
-                return "[SENHA TRANCADA - Clique em Senhas > Destrancar]"
-            return None
+                return PasswordResult('locked', None)
+            return PasswordResult('missing', None)
+        
+        senha = self._senhas_cache.get(nome_servidor)
+        if senha is not None:
+            return PasswordResult('ok', senha)
         
         try:
             senha = self.servidor_manager.obter_senha(nome_servidor)
             if senha:
                 logger.debug(f"Senha criptografada obtida para: {nome_servidor}")
-                return senha
+                self._senhas_cache[nome_servidor] = senha
+                return PasswordResult('ok', senha)
         except Exception as e:
             logger.warning(f"Erro ao obter senha criptografada para {nome_servidor}: {str(e)}")
         
-        return None
+        return PasswordResult('missing', None)
     
     def _salvar_senha_automatica(self, servidor_nome: str, senha: str):
         """Salva senha automaticamente se habilitado"""
@@ -642,8 +891,8 @@ class FreeRDPGUIWindow(QMainWindow):
         
         try:
             if self.servidor_manager.salvar_senha(servidor_nome, senha):
-                status = self.crypto_manager.get_status_info()
-                tipo_chave = "personalizada" if status['has_custom_password'] else "padrão"
+                self._senhas_cache[servidor_nome] = senha
+                tipo_chave = "personalizada" if self.crypto_manager.has_custom_master_password() else "padrão"
                 logger.info(f"Senha salva automaticamente para: {servidor_nome} (chave {tipo_chave})")
                 self._atualizar_indicador_senha_salva(True)
         except Exception as e:
@@ -663,33 +912,42 @@ class FreeRDPGUIWindow(QMainWindow):
                 sec_value = dados[2]
                 logger.debug(f"Usando sec do servidor '{servidor_nome}': {sec_value}")
         
-        # Fallback para opções globais se servidor não tem sec definido
-        if not sec_value:
-            protocolos_sec = []
-            if self.check_sec_rdp.isChecked():
-                protocolos_sec.append('rdp')
-            if self.check_sec_tls.isChecked():
-                protocolos_sec.append('tls')
-            if self.check_sec_nla.isChecked():
-                protocolos_sec.append('nla')
-            if self.check_sec_ext.isChecked():
-                protocolos_sec.append('ext')
-            if self.check_sec_aad.isChecked():
-                protocolos_sec.append('aad')
-            
-            sec_value = ';'.join(protocolos_sec) if protocolos_sec else None
-        
-        return {
-            'clipboard': self.check_clipboard.isChecked(),
-            'montar_home': self.check_home.isChecked(),
-            'som': SOM_MAP.get(self.combo_som.currentText(), 'local'),
-            'impressoras': self.check_impressoras.isChecked(),
-            'multimonitor': self.check_multimonitor.isChecked(),
-            'resolucao': RESOLUCAO_MAP.get(self.combo_resolucao.currentText(), 'auto'),
-            'qualidade': QUALIDADE_MAP.get(self.combo_qualidade.currentText(), 'broadband'),
-            'ignorar_cert': self.check_ignorar_cert.isChecked(),
-            'sec': sec_value
-        }
+        if self._opcoes_cache is None:
+            self._opcoes_cache = {
+                'clipboard': self.check_clipboard.isChecked(),
+                'montar_home': self.check_home.isChecked(),
+                'som': self._opt_som,
+                'impressoras': self.check_impressoras.isChecked(),
+                'multimonitor': self.check_multimonitor.isChecked(),
+                'resolucao': self._opt_resolucao,
+                'qualidade': self._opt_qualidade,
+                'ignorar_cert': self.check_ignorar_cert.isChecked(),
+                'sec': ';'.join(self._obter_protocolos_sec()) or None
+            }
+        
+        # Cópia: o RDPThread guarda a referência do dicionário recebido
+        opcoes = dict(self._opcoes_cache)
+        
+        # Sec do servidor tem prioridade sobre os protocolos globais
+        if sec_value:
+            opcoes['sec'] = sec_value
+        
+        return opcoes
+    
+    def _obter_protocolos_sec(self) -> list:
+        """Retorna protocolos de segurança globais marcados na aba Opções"""
+        protocolos_sec = []
+        if self.check_sec_rdp.isChecked():
+            protocolos_sec.append('rdp')
+        if self.check_sec_tls.isChecked():
+            protocolos_sec.append('tls')
+        if self.check_sec_nla.isChecked():
+            protocolos_sec.append('nla')
+        if self.check_sec_ext.isChecked():
+            protocolos_sec.append('ext')
+        if self.check_sec_aad.isChecked():
+            protocolos_sec.append('aad')
+        return protocolos_sec
     
     def _validar_entrada(self) -> Tuple[bool, str]:
         """Valida dados de entrada"""
@@ -718,32 +976,60 @@ class FreeRDPGUIWindow(QMainWindow):
         if not senha:
             return False, "Digite a senha"
         
-        if senha.startswith("[SENHA TRANCADA"):
+        if senha == _TEXTO_SENHA_TRANCADA:
             return False, "Desbloqueie as senhas primeiro (Menu Senhas > Destrancar)"
         
         return True, ""
     
+    def verificar_freerdp_em_segundo_plano(self, ignorar_cache: bool = False):
+        """
+        Verifica o FreeRDP sem bloquear a interface
+        
+        O botão Conectar fica desabilitado até o resultado chegar.
+        
+        Args:
+            ignorar_cache: Procura os comandos de novo (pedido do usuário)
+        """
+        self._freerdp_disponivel = None
+        self.btn_conectar.setEnabled(False)
+        check = _FreeRDPCheck(ignorar_cache)
+        check.signals.concluido.connect(self._on_freerdp_verificado)
+        QThreadPool.globalInstance().start(check)
+    
+    @Slot(bool)
+    def _on_freerdp_verificado(self, disponivel: bool):
+        """Recebe o resultado da verificação do FreeRDP"""
+        self._freerdp_disponivel = disponivel
+        self.btn_conectar.setEnabled(True)
+        if disponivel:
+            logger.info("FreeRDP detectado")
+            self.statusBar().showMessage("FreeRDP detectado", 5000)
+            return
+        
+        logger.error("Dependências faltando: FreeRDP")
+        self._avisar_freerdp_ausente(
+            "FreeRDP não encontrado.\n\n"
+            "Instale: sudo apt install freerdp2-x11 OU "
+            "flatpak install flathub com.freerdp.FreeRDP"
+        )
+    
+    def _avisar_freerdp_ausente(self, mensagem: str):
+        """Avisa que o FreeRDP falta e oferece verificar de novo após a instalação"""
+        caixa = QMessageBox(QMessageBox.Icon.Warning, "Dependências", mensagem,
+                            QMessageBox.StandardButton.Ok, self)
+        btn_verificar = caixa.addButton("Verificar novamente", QMessageBox.ButtonRole.ActionRole)
+        caixa.exec()
+        if caixa.clickedButton() is btn_verificar:
+            self.verificar_freerdp_em_segundo_plano(ignorar_cache=True)
+    
+    @Slot()
     def _conectar(self):
         """Inicia conexão RDP"""
-        freerdp_ok = verificar_comando_disponivel("xfreerdp3")
-        if not freerdp_ok:
-            freerdp_ok = verificar_comando_disponivel("xfreerdp")
-        if not freerdp_ok:
-            freerdp_ok = verificar_comando_disponivel("freerdp")
-        if not freerdp_ok:
-            try:
-                result = subprocess.run(
-                    ["flatpak", "run", "com.freerdp.FreeRDP", "/help"],
-                    capture_output=True, timeout=5
-                )
-                if result.returncode != 127:
-                    freerdp_ok = True
-            except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError):
-                freerdp_ok = False
-
-        if not freerdp_ok:
-            QMessageBox.critical(self, "Dependências", 
-                               "FreeRDP não encontrado. Instale o pacote freerdp ou o Flathub com.freerdp.FreeRDP.")
+        # Resultado em cache na janela; nova busca só via "Verificar novamente"
+        if self._freerdp_disponivel is False:
+            self._avisar_freerdp_ausente(
+                "FreeRDP não encontrado. Instale o pacote freerdp ou o Flathub com.freerdp.FreeRDP."
+            )
             return
 
         valido, erro = self._validar_entrada()
@@ -767,24 +1053,39 @@ class FreeRDPGUIWindow(QMainWindow):
         
         self._iniciar_conexao(host, usuario, senha, opcoes)
     
+    @Slot(str)
     def _conectar_rapido(self, servidor: str):
         """Conexão rápida via system tray"""
         if servidor not in self.servidores:
             return
         
+        # Mesmo resultado em cache usado por _conectar
+        if self._freerdp_disponivel is not True:
+            self.show()
+            self.raise_()
+            self.activateWindow()
+            if self._freerdp_disponivel is False:
+                self._avisar_freerdp_ausente(
+                    "FreeRDP não encontrado. Instale o pacote freerdp ou o Flathub com.freerdp.FreeRDP."
+                )
+            else:
+                self._notificar("FreeRDP-GUI", "Verificando FreeRDP, tente novamente em instantes")
+            return
+        
         host, usuario_padrao = self.servidores[servidor]
         
-        senha = self._obter_senha_criptografada(servidor)
-        if not senha or senha.startswith("[SENHA TRANCADA"):
+        resultado = self._obter_senha_criptografada(servidor)
+        if resultado.state != 'ok':
             self.show()
             self.raise_()
             self.activateWindow()
-            if senha and senha.startswith("[SENHA TRANCADA"):
+            if resultado.state == 'locked':
                 self._notificar("FreeRDP-GUI", f"Desbloqueie as senhas primeiro")
             else:
                 self._notificar("FreeRDP-GUI", f"Configure a senha para {servidor}")
             return
         
+        senha = resultado.value
         opcoes = self._obter_opcoes_conexao(servidor)
         self._iniciar_conexao(host, usuario_padrao, senha, opcoes)
     
@@ -792,24 +1093,35 @@ class FreeRDPGUIWindow(QMainWindow):
         """Inicia conexão RDP com parâmetros fornecidos"""
         logger.info(f"Iniciando conexão RDP para {host} com usuário {usuario}")
         
-        self.incrementar_conexoes()
         self.hide()
         
-        thread_id = host
-        rdp_thread = RDPThread(host, usuario, senha, opcoes)
-        self.rdp_threads[thread_id] = rdp_thread
-        rdp_thread.finished.connect(lambda sucesso, mensagem: self._on_conexao_finalizada(thread_id, sucesso, mensagem))
+        slot = self._next_thread_slot
+        self._next_thread_slot += 1
+        rdp_thread = RDPThread(host, usuario, senha, opcoes, self)
+        rdp_thread.setObjectName(host)
+        rdp_thread.setProperty("slot", slot)
+        self.rdp_threads[slot] = rdp_thread
+        logger.info(f"Conexões ativas: {self._conexoes_ativas()}")
+        rdp_thread.conexao_finalizada.connect(self._on_conexao_finalizada_dispatch)
+        rdp_thread.finished.connect(rdp_thread.deleteLater)
         rdp_thread.start()
     
-    def _on_conexao_finalizada(self, thread_id: str, sucesso: bool, mensagem: str):
+    @Slot(bool, str)
+    def _on_conexao_finalizada_dispatch(self, sucesso: bool, mensagem: str):
+        """Recebe conexao_finalizada do RDPThread e identifica a thread pelo slot"""
+        self._on_conexao_finalizada(self.sender().property("slot"), sucesso, mensagem)
+    
+    def _on_conexao_finalizada(self, slot: int, sucesso: bool, mensagem: str):
         """Chamado quando conexão RDP termina"""
-        self.decrementar_conexoes()
+        # rdp_threads é a única fonte do número de conexões ativas
+        # Slots com encerramento pendente são liberados em _on_thread_encerrada
+        if slot not in self._pending_shutdowns:
+            self._liberar_slot(slot)
+        logger.info(f"Conexões ativas: {self._conexoes_ativas()}")
+        self.verificar_saida_completa()
 
-        if thread_id in self.rdp_threads:
-            thread = self.rdp_threads.pop(thread_id)
-            thread.deleteLater()
-
-        self.btn_conectar.setEnabled(True)
+        # Verificação do FreeRDP pendente mantém o botão desabilitado
+        self.btn_conectar.setEnabled(self._freerdp_disponivel is not None)
         self.btn_conectar.setText("Conectar")
         
         if sucesso:
@@ -817,28 +1129,23 @@ class FreeRDPGUIWindow(QMainWindow):
         else:
             self._notificar("FreeRDP-GUI", f"Erro: {mensagem}", "error")
             logger.error(f"Erro na conexão: {mensagem}")
-        
-        self._limpar_thread_rdp()
     
     def _notificar(self, titulo: str, mensagem: str, tipo: str = "information"):
         """Envia notificação (desktop ou tray)"""
         if not notificar_desktop(titulo, mensagem, tipo):
-            if hasattr(self, 'system_tray'):
+            if self.system_tray is not None:
                 self.system_tray.notificar(titulo, mensagem, tipo)
     
     def _salvar_configuracoes(self):
-        """Salva configurações atuais"""
-        sec_protocols = []
-        if self.check_sec_rdp.isChecked():
-            sec_protocols.append('rdp')
-        if self.check_sec_tls.isChecked():
-            sec_protocols.append('tls')
-        if self.check_sec_nla.isChecked():
-            sec_protocols.append('nla')
-        if self.check_sec_ext.isChecked():
-            sec_protocols.append('ext')
-        if self.check_sec_aad.isChecked():
-            sec_protocols.append('aad')
+        """Agenda gravação das configurações atuais (chamadas próximas são agrupadas)"""
+        self._save_timer.start()
+    
+    @Slot()
+    def _do_save_configuracoes(self):
+        """Grava imediatamente as configurações atuais"""
+        self._save_timer.stop()
+        
+        sec_protocols = self._obter_protocolos_sec()
         
         config = {
             'servidor': self.combo_servidor.currentText(),
@@ -855,7 +1162,11 @@ class FreeRDPGUIWindow(QMainWindow):
             'sec_protocols': sec_protocols,
         }
         
+        if config == self._last_saved_config:
+            return
+        
         self.settings_manager.salvar_configuracao_interface(config)
+        self._last_saved_config = config
         logger.debug("Configurações salvas")
     
     def _restaurar_configuracoes(self):
@@ -893,6 +1204,7 @@ class FreeRDPGUIWindow(QMainWindow):
         
         logger.debug("Configurações restauradas")
     
+    @Slot()
     def mostrar_logs(self):
         """Mostra janela de logs"""
         if self.logs_window is None:
@@ -905,28 +1217,30 @@ class FreeRDPGUIWindow(QMainWindow):
     def closeEvent(self, event):
         """Evento de fechamento da janela"""
         if self._fechar_de_verdade:
+            self._do_save_configuracoes()
             if not self._limpar_thread_rdp():
-                logger.warning("Forçando saída mesmo com thread ativa")
-            self._salvar_configuracoes()
+                # A saída acontece quando as threads terminarem (aplicacao_deve_sair)
+                self.hide()
+                event.ignore()
+                return
             event.accept()
             return
 
-        if self.conexoes_ativas > 0:
+        if self._conexoes_ativas():
             resposta = QMessageBox.question(
                 self, "Conexão Ativa", 
                 "Há uma conexão RDP ativa. Deseja realmente sair?",
-                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+                _BTN_YN
             )
             
-            if resposta == QMessageBox.StandardButton.Yes:
-                self._limpar_thread_rdp()
+            if resposta == _BTN_YES:
                 self.sair_aplicacao()
                 event.accept()
             else:
                 event.ignore()
-                return
+            return
         
-        if hasattr(self, 'system_tray') and self.system_tray.is_available():
+        if self.system_tray is not None and self.system_tray.is_available():
             self.hide()
             event.ignore()
             self.verificar_saida_completa()
@@ -936,19 +1250,21 @@ class FreeRDPGUIWindow(QMainWindow):
 
     def changeEvent(self, event):
         """Gerencia mudanças de estado da janela"""
-        if event.type() == event.Type.WindowStateChange:
-            if self.windowState() == Qt.WindowState.WindowMinimized:
-                if hasattr(self, 'system_tray') and self.system_tray.is_available():
+        if event.type() == _EVT_WINDOW_STATE_CHANGE:
+            if self.windowState() == _WIN_MIN:
+                if self.system_tray is not None and self.system_tray.is_available():
                     self.hide()
                     event.ignore()
         super().changeEvent(event)
     
+    @Slot()
     def show_window(self):
         """Mostra e foca a janela"""
         self.show()
         self.raise_()
         self.activateWindow()
 
+    @Slot()
     def _ocultar_janela(self):
         """Oculta a janela (minimiza para tray sem sair)"""
         logger.info("Ocultando janela para system tray")
@@ -959,7 +1275,8 @@ class FreeRDPGUIWindow(QMainWindow):
         logger.info("Sinal sair_aplicacao recebido → encerrando de verdade")
         self._fechar_de_verdade = True
         super().close()
-        QApplication.quit()
+        if not self._pending_shutdowns:
+            QApplication.quit()
 
 # Manter compatibilidade com o nome antigo
 RDPConnectorWindow = FreeRDPGUIWindow
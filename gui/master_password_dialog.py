@@ -9,29 +9,71 @@ try:
     from PySide6.QtWidgets import (
         QDialog, QVBoxLayout, QHBoxLayout, QFormLayout,
         QLabel, QLineEdit, QPushButton, QMessageBox, QCheckBox,
-        QGroupBox, QDialogButtonBox
+        QGroupBox, QDialogButtonBox, QApplication, QProgressDialog, QLayout
     )
-    from PySide6.QtCore import Qt
+    from PySide6.QtCore import Qt, QObject, QThread, QTimer, Signal, Slot
     from PySide6.QtGui import QFont, QPixmap, QIcon
 except ImportError as e:
     raise ImportError(f"PySide6 não encontrado: {e}")
 
 from core.crypto import get_crypto_manager
-from core.utils import get_project_root, arquivo_existe
+from core.utils import get_project_root
 
 logger = logging.getLogger(__name__)
 
+# Ícones e fontes compartilhados entre instâncias (criados sob demanda)
+_WINDOW_ICON: Optional[QIcon] = None
+_HEADER_ICON: Optional[QIcon] = None
+_FONT_SIZES = {'header': 24, 'message': 10, 'tip': 8}
+_FONTS = {}
+
+def _get_window_icon() -> QIcon:
+    """Ícone das janelas dos dialogs (assets com fallback do tema)"""
+    global _WINDOW_ICON
+    if _WINDOW_ICON is None:
+        icon = QIcon()
+        try:
+            icon_path = get_project_root() / "assets" / "rdp-icon.png"
+            if icon_path.is_file():
+                icon = QIcon(str(icon_path))
+            else:
+                icon = QIcon.fromTheme("dialog-password")
+        except Exception:
+            pass
+        _WINDOW_ICON = icon
+    return _WINDOW_ICON
+
+def _get_header_icon() -> QIcon:
+    """Ícone exibido no cabeçalho do dialog"""
+    global _HEADER_ICON
+    if _HEADER_ICON is None:
+        _HEADER_ICON = QIcon.fromTheme("dialog-password", QIcon.fromTheme("security-high"))
+    return _HEADER_ICON
+
+def _get_font(kind: str) -> QFont:
+    """Fonte Arial do tamanho associado a kind ('header', 'message', 'tip')"""
+    font = _FONTS.get(kind)
+    if font is None:
+        font = _FONTS[kind] = QFont("Arial", _FONT_SIZES[kind])
+    return font
+
 class MasterPasswordDialog(QDialog):
     """Dialog para entrada da master password"""
     
+    # Dispara ChangePasswordWorker.run na thread do worker (migração PBKDF2 -> Argon2id)
+    _migracao_solicitada = Signal(str, str)
+    
     def __init__(self, parent=None, title: str = "Master Password", 
                  message: str = "Digite a master password:", 
                  is_first_time: bool = False):
         super().__init__(parent)
         
         self.crypto_manager = get_crypto_manager()
-        self.password = ""
         self.is_first_time = is_first_time
+        self._kdf_in_progress = False
+        self._password_visible = False
+        self._worker_thread: Optional[QThread] = None
+        self._progress: Optional[QProgressDialog] = None
         
         self._init_ui(title, message)
     
@@ -39,22 +81,14 @@ class MasterPasswordDialog(QDialog):
         """Inicializa interface"""
         self.setWindowTitle(title)
         # Definir ícone do dialog a partir de assets com fallback
-        try:
-            icon_path = get_project_root() / "assets" / "rdp-icon.png"
-            if arquivo_existe(str(icon_path)):
-                icon = QIcon(str(icon_path))
-                if not icon.isNull():
-                    self.setWindowIcon(icon)
-            else:
-                theme_icon = QIcon.fromTheme("dialog-password")
-                if not theme_icon.isNull():
-                    self.setWindowIcon(theme_icon)
-        except Exception:
-            pass
+        icon = _get_window_icon()
+        if not icon.isNull():
+            self.setWindowIcon(icon)
         self.setModal(True)
-        self.setFixedSize(400, 250 if not self.is_first_time else 350)
         
         layout = QVBoxLayout(self)
+        # Tamanho fixo calculado pelo layout a partir dos sizeHints
+        layout.setSizeConstraint(QLayout.SizeConstraint.SetFixedSize)
         
         # Ícone e mensagem principal
         self._add_header(layout, message)
@@ -79,14 +113,14 @@ class MasterPasswordDialog(QDialog):
         # Ícone (tentar usar ícone do sistema)
         icon_label = QLabel()
         try:
-            icon = QIcon.fromTheme("dialog-password", QIcon.fromTheme("security-high"))
+            icon = _get_header_icon()
             if not icon.isNull():
                 pixmap = icon.pixmap(48, 48)
                 icon_label.setPixmap(pixmap)
         except:
             # Fallback: texto
             icon_label.setText("🔐")
-            icon_label.setFont(QFont("Arial", 24))
+            icon_label.setFont(_get_font('header'))
         
         icon_label.setFixedSize(64, 64)
         icon_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -95,7 +129,8 @@ class MasterPasswordDialog(QDialog):
         # Mensagem
         message_label = QLabel(message)
         message_label.setWordWrap(True)
-        message_label.setFont(QFont("Arial", 10))
+        message_label.setMinimumWidth(300)
+        message_label.setFont(_get_font('message'))
         header_layout.addWidget(message_label)
         
         parent_layout.addLayout(header_layout)
@@ -104,10 +139,17 @@ class MasterPasswordDialog(QDialog):
         """Adiciona campos de senha"""
         form_layout = QFormLayout()
         
+        # Validação inline agrupada (debounce de 200ms)
+        self._validation_timer = QTimer(self)
+        self._validation_timer.setSingleShot(True)
+        self._validation_timer.setInterval(200)
+        self._validation_timer.timeout.connect(self._validar_campos)
+        
         # Campo principal de senha
         self.password_edit = QLineEdit()
         self.password_edit.setEchoMode(QLineEdit.EchoMode.Password)
         self.password_edit.returnPressed.connect(self._on_ok_clicked)
+        self.password_edit.textChanged.connect(self._validation_timer.start)
         form_layout.addRow("Senha:", self.password_edit)
         
         # Campo de confirmação (só na primeira vez)
@@ -115,7 +157,15 @@ class MasterPasswordDialog(QDialog):
             self.confirm_edit = QLineEdit()
             self.confirm_edit.setEchoMode(QLineEdit.EchoMode.Password)
             self.confirm_edit.returnPressed.connect(self._on_ok_clicked)
+            self.confirm_edit.textChanged.connect(self._validation_timer.start)
             form_layout.addRow("Confirmar:", self.confirm_edit)
+            
+            self.confirm_error_label = QLabel()
+            self.confirm_error_label.setStyleSheet("color:red")
+            self.confirm_error_label.setVisible(False)
+            form_layout.addRow("", self.confirm_error_label)
+        
+        self._password_edits = [self.password_edit] + ([self.confirm_edit] if self.is_first_time else [])
         
         parent_layout.addLayout(form_layout)
     
@@ -124,7 +174,9 @@ class MasterPasswordDialog(QDialog):
         group_box = QGroupBox("Dicas de Segurança")
         group_layout = QVBoxLayout(group_box)
         
-        # Dicas
+        group_layout.setContentsMargins(9, 6, 9, 6)
+        
+        # Dicas (um único label em rich text)
         tips = [
             "• Use uma senha forte com pelo menos 12 caracteres",
             "• Misture letras, números e símbolos",
@@ -132,10 +184,10 @@ class MasterPasswordDialog(QDialog):
             "• Não use senhas que você usa em outros lugares"
         ]
         
-        for tip in tips:
-            tip_label = QLabel(tip)
-            tip_label.setFont(QFont("Arial", 8))
-            group_layout.addWidget(tip_label)
+        tips_label = QLabel("<br>".join(tips))
+        tips_label.setTextFormat(Qt.TextFormat.RichText)
+        tips_label.setFont(_get_font('tip'))
+        group_layout.addWidget(tips_label)
         
         parent_layout.addWidget(group_box)
     
@@ -154,10 +206,11 @@ class MasterPasswordDialog(QDialog):
         button_layout.addStretch()
         
         # Botões principais
-        btn_ok = QPushButton("OK")
-        btn_ok.clicked.connect(self._on_ok_clicked)
-        btn_ok.setDefault(True)
-        button_layout.addWidget(btn_ok)
+        self.btn_ok = QPushButton("OK")
+        self.btn_ok.clicked.connect(self._on_ok_clicked)
+        self.btn_ok.setDefault(True)
+        self.btn_ok.setEnabled(False)
+        button_layout.addWidget(self.btn_ok)
         
         btn_cancel = QPushButton("Cancelar")
         btn_cancel.clicked.connect(self.reject)
@@ -167,37 +220,27 @@ class MasterPasswordDialog(QDialog):
     
     def _toggle_password_visibility(self):
         """Alterna visibilidade da senha"""
-        if self.password_edit.echoMode() == QLineEdit.EchoMode.Password:
-            self.password_edit.setEchoMode(QLineEdit.EchoMode.Normal)
-            if self.is_first_time:
-                self.confirm_edit.setEchoMode(QLineEdit.EchoMode.Normal)
-            self.show_password_btn.setText("🙈")
-        else:
-            self.password_edit.setEchoMode(QLineEdit.EchoMode.Password)
-            if self.is_first_time:
-                self.confirm_edit.setEchoMode(QLineEdit.EchoMode.Password)
-            self.show_password_btn.setText("👁")
+        self._password_visible = not self._password_visible
+        mode = (QLineEdit.EchoMode.Normal if self._password_visible
+                else QLineEdit.EchoMode.Password)
+        for edit in self._password_edits:
+            edit.setEchoMode(mode)
+        self.show_password_btn.setText("🙈" if self._password_visible else "👁")
     
     def _on_ok_clicked(self):
         """Processa clique em OK"""
-        password = self.password_edit.text()
+        # Enter repetido não dispara uma segunda derivação de chave
+        if self._kdf_in_progress or self._progress is not None:
+            return
         
-        # Validações básicas
-        if not password:
-            QMessageBox.warning(self, "Erro", "Digite uma senha.")
-            self.password_edit.setFocus()
+        # Enter pode chegar antes do debounce: validar agora
+        if not self._validar_campos():
             return
         
+        password = self.password_edit.text()
+        
         # Validação específica da primeira vez
         if self.is_first_time:
-            confirm_password = self.confirm_edit.text()
-            
-            if password != confirm_password:
-                QMessageBox.warning(self, "Erro", "As senhas não conferem.")
-                self.confirm_edit.clear()
-                self.confirm_edit.setFocus()
-                return
-            
             if len(password) < 8:
                 result = QMessageBox.question(
                     self, "Senha Fraca",
@@ -210,59 +253,180 @@ class MasterPasswordDialog(QDialog):
                     self.password_edit.setFocus()
                     return
         
-        # Tentar definir a senha
-        if self.crypto_manager.set_master_password(password):
-            self.password = password
-            self.accept()
-        else:
-            QMessageBox.critical(self, "Erro", 
-                               "Senha incorreta." if not self.is_first_time 
-                               else "Erro ao definir senha.")
-            self.password_edit.clear()
-            if self.is_first_time:
-                self.confirm_edit.clear()
-            self.password_edit.setFocus()
-    
-    def get_password(self) -> Optional[str]:
+        # Derivação roda depois que o evento atual retorna
+        self._kdf_in_progress = True
+        QTimer.singleShot(0, self._run_kdf)
+    
+    @Slot()
+    def _validar_campos(self) -> bool:
         """
-        Obtém senha digitada
+        Atualiza mensagens inline e o botão OK conforme os campos
         
         Returns:
-            Senha digitada ou None se cancelado
+            True se os campos são válidos
         """
-        if self.exec() == QDialog.DialogCode.Accepted:
-            return self.password
-        return None
+        self._validation_timer.stop()
+        password = self.password_edit.text()
+        valido = bool(password)
+        
+        if self.is_first_time:
+            confirm_password = self.confirm_edit.text()
+            divergente = bool(confirm_password) and password != confirm_password
+            self.confirm_error_label.setText("As senhas não conferem." if divergente else "")
+            self.confirm_error_label.setVisible(divergente)
+            valido = valido and password == confirm_password
+        
+        self.btn_ok.setEnabled(valido)
+        return valido
+    
+    @Slot()
+    def _run_kdf(self):
+        """Deriva a chave e define a master password"""
+        try:
+            # Dialog fechado antes da derivação começar
+            if not self.isVisible():
+                return
+            
+            password = self.password_edit.text()
+            
+            # Primeira configuração: calibrar custo da KDF para este hardware
+            if self.is_first_time and not self.crypto_manager.has_custom_master_password():
+                self._calibrar_kdf()
+            
+            # Tentar definir a senha
+            if self.crypto_manager.set_master_password(password):
+                # Instalações antigas (PBKDF2) migram para Argon2id fora da thread da interface
+                if self.crypto_manager.needs_kdf_upgrade():
+                    self._iniciar_migracao(password)
+                else:
+                    self.accept()
+            else:
+                QMessageBox.critical(self, "Erro", 
+                                   "Senha incorreta." if not self.is_first_time 
+                                   else "Erro ao definir senha.")
+                self.password_edit.clear()
+                if self.is_first_time:
+                    self.confirm_edit.clear()
+                self.password_edit.setFocus()
+        finally:
+            self._kdf_in_progress = False
+    
+    def _calibrar_kdf(self):
+        """Calibra a KDF mostrando progresso para a interface não parecer travada"""
+        progress = QProgressDialog("Calibrando...", None, 0, 0, self)
+        progress.setWindowTitle("Configurar Master Password")
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.show()
+        QApplication.processEvents()
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            self.crypto_manager.calibrate_kdf()
+        except Exception as e:
+            logger.warning(f"Erro ao calibrar KDF: {e}")
+        finally:
+            QApplication.restoreOverrideCursor()
+            progress.close()
+    
+    def _iniciar_migracao(self, password: str):
+        """Re-criptografa as senhas com Argon2id em thread separada"""
+        self._worker_thread = QThread(self)
+        worker = ChangePasswordWorker(self.crypto_manager)
+        worker.moveToThread(self._worker_thread)
+        self._worker_thread.finished.connect(worker.deleteLater)
+        self._migracao_solicitada.connect(worker.run)
+        worker.finished.connect(self._on_migracao_concluida)
+        self._worker_thread.start()
+        
+        self.btn_ok.setEnabled(False)
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        
+        self._progress = QProgressDialog("Atualizando proteção das senhas salvas...", None, 0, 0, self)
+        self._progress.setWindowTitle("Master Password")
+        self._progress.setWindowModality(Qt.WindowModality.WindowModal)
+        self._progress.setMinimumDuration(0)
+        self._progress.show()
+        
+        self._migracao_solicitada.emit(password, password)
+    
+    @Slot(object, str)
+    def _on_migracao_concluida(self, nova_chave: Optional[bytes], erro: str):
+        """Recebe o resultado da migração; em caso de falha a sessão segue com PBKDF2"""
+        QApplication.restoreOverrideCursor()
+        if self._progress is not None:
+            self._progress.close()
+            self._progress = None
+        
+        if nova_chave is not None:
+            self.crypto_manager.activate_key(nova_chave)
+            logger.info("Master password migrada de PBKDF2 para Argon2id")
+        else:
+            logger.warning(f"Erro ao migrar master password para Argon2id: {erro}")
+        self.accept()
+    
+    def reject(self):
+        """Impede fechar o dialog durante a migração"""
+        if self._progress is not None:
+            return
+        super().reject()
+    
+    def done(self, result: int):
+        """Encerra a thread do worker ao fechar o dialog"""
+        if self._worker_thread is not None:
+            self._worker_thread.quit()
+            self._worker_thread.wait()
+            self._worker_thread = None
+        super().done(result)
+
+class ChangePasswordWorker(QObject):
+    """
+    Re-criptografa as senhas com a nova master password fora da thread da interface
+    
+    Só grava os arquivos; a nova chave volta pelo sinal e é adotada na
+    thread da interface, junto com a recarga do ConfigParser compartilhado.
+    """
+    
+    finished = Signal(object, str)  # (nova chave ou None, mensagem de erro)
+    
+    def __init__(self, crypto_manager):
+        super().__init__()
+        self.crypto_manager = crypto_manager
+    
+    @Slot(str, str)
+    def run(self, current: str, new: str):
+        try:
+            self.finished.emit(self.crypto_manager.rekey_master_password(current, new), "")
+        except Exception as e:
+            logger.exception("Erro ao alterar master password")
+            self.finished.emit(None, str(e))
 
 class ChangeMasterPasswordDialog(QDialog):
     """Dialog para alteração da master password"""
     
+    # Dispara ChangePasswordWorker.run na thread do worker
+    _alteracao_solicitada = Signal(str, str)
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         
         self.crypto_manager = get_crypto_manager()
+        self._worker_thread: Optional[QThread] = None
+        self._worker: Optional[ChangePasswordWorker] = None
+        self._progress: Optional[QProgressDialog] = None
         self._init_ui()
     
     def _init_ui(self):
         """Inicializa interface"""
         self.setWindowTitle("Alterar Master Password")
         # Definir ícone do dialog de alteração a partir de assets com fallback
-        try:
-            icon_path = get_project_root() / "assets" / "rdp-icon.png"
-            if arquivo_existe(str(icon_path)):
-                icon = QIcon(str(icon_path))
-                if not icon.isNull():
-                    self.setWindowIcon(icon)
-            else:
-                theme_icon = QIcon.fromTheme("dialog-password")
-                if not theme_icon.isNull():
-                    self.setWindowIcon(theme_icon)
-        except Exception:
-            pass
+        icon = _get_window_icon()
+        if not icon.isNull():
+            self.setWindowIcon(icon)
         self.setModal(True)
-        self.setFixedSize(400, 300)
         
         layout = QVBoxLayout(self)
+        # Tamanho fixo calculado pelo layout a partir dos sizeHints
+        layout.setSizeConstraint(QLayout.SizeConstraint.SetFixedSize)
         
         # Aviso
         warning_label = QLabel(
@@ -270,6 +434,7 @@ class ChangeMasterPasswordDialog(QDialog):
             "Este processo pode demorar alguns segundos."
         )
         warning_label.setWordWrap(True)
+        warning_label.setMinimumWidth(380)
         warning_label.setStyleSheet("color: #FF8C00; padding: 10px; background-color: #FFF8DC; border-radius: 5px;")
         layout.addWidget(warning_label)
         
@@ -297,6 +462,7 @@ class ChangeMasterPasswordDialog(QDialog):
         button_box.accepted.connect(self._change_password)
         button_box.rejected.connect(self.reject)
         layout.addWidget(button_box)
+        self.button_box = button_box
         
         # Focar no primeiro campo
         self.current_password_edit.setFocus()
@@ -328,30 +494,73 @@ class ChangeMasterPasswordDialog(QDialog):
             if result != QMessageBox.StandardButton.Yes:
                 return
         
-        # Tentar alterar
-        try:
-            # Mostrar progresso
-            QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
-            
-            if self.crypto_manager.change_master_password(current, new):
-                QApplication.restoreOverrideCursor()
-                QMessageBox.information(self, "Sucesso", 
-                                      "Master password alterada com sucesso!")
-                self.accept()
-            else:
-                QApplication.restoreOverrideCursor()
-                QMessageBox.critical(self, "Erro", 
-                                   "Erro ao alterar master password. Verifique a senha atual.")
-                self.current_password_edit.clear()
-                self.current_password_edit.setFocus()
-        except Exception as e:
-            QApplication.restoreOverrideCursor()
-            QMessageBox.critical(self, "Erro", f"Erro inesperado: {str(e)}")
-            logger.exception("Erro ao alterar master password")
+        self._iniciar_alteracao(current, new)
+    
+    def _iniciar_alteracao(self, current: str, new: str):
+        """Inicia a re-criptografia em thread separada"""
+        if self._worker_thread is None:
+            self._worker_thread = QThread(self)
+            self._worker = ChangePasswordWorker(self.crypto_manager)
+            self._worker.moveToThread(self._worker_thread)
+            self._worker_thread.finished.connect(self._worker.deleteLater)
+            self._alteracao_solicitada.connect(self._worker.run)
+            self._worker.finished.connect(self._on_alteracao_concluida)
+            self._worker_thread.start()
+        
+        self.button_box.setEnabled(False)
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        
+        self._progress = QProgressDialog("Re-criptografando senhas salvas...", None, 0, 0, self)
+        self._progress.setWindowTitle("Alterar Master Password")
+        self._progress.setWindowModality(Qt.WindowModality.WindowModal)
+        self._progress.setMinimumDuration(0)
+        self._progress.show()
+        
+        self._alteracao_solicitada.emit(current, new)
+    
+    @Slot(object, str)
+    def _on_alteracao_concluida(self, nova_chave: Optional[bytes], erro: str):
+        """Recebe o resultado do ChangePasswordWorker"""
+        QApplication.restoreOverrideCursor()
+        if self._progress is not None:
+            self._progress.close()
+            self._progress = None
+        self.button_box.setEnabled(True)
+        
+        if nova_chave is not None:
+            self.crypto_manager.activate_key(nova_chave)
+            QMessageBox.information(self, "Sucesso", 
+                                  "Master password alterada com sucesso!")
+            self.accept()
+        elif erro:
+            QMessageBox.critical(self, "Erro", f"Erro inesperado: {erro}")
+        else:
+            QMessageBox.critical(self, "Erro", 
+                               "Erro ao alterar master password. Verifique a senha atual.")
+            self.current_password_edit.clear()
+            self.current_password_edit.setFocus()
+    
+    def _em_andamento(self) -> bool:
+        """Indica se há uma re-criptografia em execução"""
+        return self._progress is not None
+    
+    def reject(self):
+        """Impede fechar o dialog durante a re-criptografia"""
+        if self._em_andamento():
+            return
+        super().reject()
+    
+    def done(self, result: int):
+        """Encerra a thread do worker ao fechar o dialog"""
+        if self._worker_thread is not None:
+            self._worker_thread.quit()
+            self._worker_thread.wait()
+            self._worker_thread = None
+        super().done(result)
 
 # Funções de conveniência
 
-def solicitar_master_password(parent=None, is_first_time: bool = False) -> Optional[str]:
+def solicitar_master_password(parent=None, is_first_time: bool = False) -> bool:
     """
     Solicita master password do usuário
     
@@ -360,7 +569,7 @@ def solicitar_master_password(parent=None, is_first_time: bool = False) -> Optio
         is_first_time: Se é a primeira vez definindo a senha
         
     Returns:
-        Senha digitada ou None se cancelado
+        True se a senha foi aceita (False se cancelado)
     """
     title = "Configurar Master Password" if is_first_time else "Master Password"
     message = ("Defina uma master password para proteger suas senhas RDP:" 
@@ -368,7 +577,7 @@ def solicitar_master_password(parent=None, is_first_time: bool = False) -> Optio
               else "Digite sua master password:")
     
     dialog = MasterPasswordDialog(parent, title, message, is_first_time)
-    return dialog.get_password()
+    return dialog.exec() == QDialog.DialogCode.Accepted
 
 def alterar_master_password(parent=None) -> bool:
     """
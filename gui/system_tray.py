@@ -4,19 +4,84 @@ Gerenciador do system tray (ícone na bandeja do sistema)
 
 import logging
 from pathlib import Path
-from typing import Dict, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 
 try:
     from PySide6.QtWidgets import QSystemTrayIcon, QMenu
-    from PySide6.QtCore import QObject, Signal
+    from PySide6.QtCore import QObject, Signal, Slot, QTimer
     from PySide6.QtGui import QIcon, QPixmap, QAction
 except ImportError as e:
     raise ImportError(f"PySide6 não encontrado: {e}")
 
-from core.utils import get_project_root, arquivo_existe
+from core.utils import get_project_root
 
 logger = logging.getLogger(__name__)
 
+# Caminhos possíveis para o ícone (avaliados uma vez)
+_ICON_PATHS = (
+    get_project_root() / "assets" / "rdp-icon.png",
+    get_project_root() / "rdp-icon.png",
+    Path.home() / ".config" / "rdp-connector" / "icon.png",
+    Path("/usr/share/pixmaps/rdp-connector.png"),
+)
+
+def _find_custom_icon() -> Optional[Path]:
+    """Procura o primeiro ícone personalizado existente entre os candidatos"""
+    for icon_path in _ICON_PATHS:
+        if icon_path.is_file():
+            return icon_path
+    return None
+
+# Mapear tipos para ícones do Qt
+_NOTIFY_ICON_MAP = {
+    "information": QSystemTrayIcon.MessageIcon.Information,
+    "warning": QSystemTrayIcon.MessageIcon.Warning,
+    "critical": QSystemTrayIcon.MessageIcon.Critical,
+    "error": QSystemTrayIcon.MessageIcon.Critical
+}
+
+# Ícone da aplicação, carregado na primeira chamada de _get_app_qicon()
+_APP_QICON: Optional[QIcon] = None
+
+def _get_app_qicon() -> QIcon:
+    """Carrega ícone para o system tray (memoizado)"""
+    global _APP_QICON
+    if _APP_QICON is not None:
+        return _APP_QICON
+    
+    # Tentar carregar ícone personalizado
+    icon_path = _find_custom_icon()
+    if icon_path is not None:
+        try:
+            icon = QIcon(str(icon_path))
+            if not icon.isNull():
+                logger.info("Ícone personalizado carregado: %s", icon_path)
+                _APP_QICON = icon
+                return icon
+        except Exception as e:
+            logger.warning(f"Erro ao carregar ícone {icon_path}: {str(e)}")
+    
+    # Fallback para ícones do sistema (cadeia resolvida pelo cache de temas do Qt)
+    icon = QIcon.fromTheme(
+        "krdc",
+        QIcon.fromTheme(
+            "network-connect",
+            QIcon.fromTheme("applications-internet", QIcon.fromTheme("network-wired"))
+        )
+    )
+    if not icon.isNull():
+        logger.info("Usando ícone do sistema: %s", icon.name())
+        _APP_QICON = icon
+        return icon
+    
+    # Último recurso (nenhum ícone no tema): o tray não aceita ícone nulo
+    pixmap = QPixmap(16, 16)
+    pixmap.fill(0x0066CC)  # Azul
+    _APP_QICON = QIcon(pixmap)
+    logger.info("Usando ícone padrão (azul)")
+    
+    return _APP_QICON
+
 class SystemTrayManager(QObject):
     """Gerenciador do ícone na bandeja do sistema"""
     
@@ -33,6 +98,17 @@ class SystemTrayManager(QObject):
         self.tray_icon = None
         self.tray_menu = None
         self.servidores = {}
+        self._servidores_snapshot = None
+        self._menu_dirty = True
+        self._server_actions: Dict[str, QAction] = {}
+        self._sorted_server_names: List[str] = []
+        
+        # Agrupa rajadas de atualizações (ex.: carga de N servidores) em uma só
+        self._pending_servidores: Optional[Dict[str, Tuple[str, str]]] = None
+        self._rebuild_timer = QTimer(self)
+        self._rebuild_timer.setSingleShot(True)
+        self._rebuild_timer.setInterval(50)
+        self._rebuild_timer.timeout.connect(self._aplicar_servidores_pendentes)
         
         self._init_system_tray()
     
@@ -46,8 +122,7 @@ class SystemTrayManager(QObject):
         self.tray_icon = QSystemTrayIcon(self.parent_window)
         
         # Carregar ícone personalizado
-        icon = self._load_icon()
-        self.tray_icon.setIcon(icon)
+        self.tray_icon.setIcon(_get_app_qicon())
         
         # Configurar menu
         self._create_menu()
@@ -60,87 +135,21 @@ class SystemTrayManager(QObject):
         
         logger.info("System tray inicializado")
     
-    def _load_icon(self) -> QIcon:
-        """Carrega ícone para o system tray"""
-        # Caminhos possíveis para o ícone
-        icon_paths = [
-            get_project_root() / "assets" / "rdp-icon.png",
-            get_project_root() / "rdp-icon.png",
-            Path.home() / ".config" / "rdp-connector" / "icon.png",
-            Path("/usr/share/pixmaps/rdp-connector.png")
-        ]
-        
-        # Tentar carregar ícone personalizado
-        for icon_path in icon_paths:
-            if arquivo_existe(str(icon_path)):
-                try:
-                    icon = QIcon(str(icon_path))
-                    if not icon.isNull():
-                        logger.info(f"Ícone personalizado carregado: {icon_path}")
-                        return icon
-                except Exception as e:
-                    logger.warning(f"Erro ao carregar ícone {icon_path}: {str(e)}")
-        
-        # Fallback para ícones do sistema
-        system_icons = ["krdc", "network-connect", "applications-internet"]
-        
-        for icon_name in system_icons:
-            icon = QIcon.fromTheme(icon_name)
-            if not icon.isNull():
-                logger.info(f"Usando ícone do sistema: {icon_name}")
-                return icon
-        
-        # Último recurso: criar ícone simples
-        pixmap = QPixmap(16, 16)
-        pixmap.fill(0x0066CC)  # Azul
-        icon = QIcon(pixmap)
-        logger.info("Usando ícone padrão (azul)")
-        
-        return icon
-    
     def _create_menu(self):
         """Cria menu do system tray"""
         self.tray_menu = QMenu()
         
-        # Será preenchido quando servidores forem atualizados
-        self._update_menu()
-        
-        # Configurar menu no ícone
-        self.tray_icon.setContextMenu(self.tray_menu)
-    
-    def _update_menu(self):
-        """Atualiza menu do system tray"""
-        if not self.tray_menu:
-            return
-        
-        # Limpar menu atual
-        self.tray_menu.clear()
-        
-        # Adicionar servidores (exceto "Manual")
-        servidores_disponiveis = [
-            nome for nome in self.servidores.keys() 
-            if nome != "Manual"
-        ]
+        # Separador após as conexões rápidas (visível só com servidores)
+        self._servers_separator = self.tray_menu.addSeparator()
+        self._servers_separator.setVisible(False)
         
-        if servidores_disponiveis:
-            # Seção de conexões rápidas
-            for servidor in sorted(servidores_disponiveis):
-                action = QAction(f"Conectar a {servidor}", self.tray_menu)
-                action.triggered.connect(
-                    lambda checked, s=servidor: self.conectar_servidor.emit(s)
-                )
-                self.tray_menu.addAction(action)
-            
-            # Separador
-            self.tray_menu.addSeparator()
-        
-        # Ações principais
+        # Ações principais (criadas uma vez, nunca destruídas)
         show_action = QAction("Mostrar", self.tray_menu)
-        show_action.triggered.connect(lambda: self.mostrar_janela.emit())
+        show_action.triggered.connect(self._on_show_triggered)
         self.tray_menu.addAction(show_action)
         
         logs_action = QAction("Ver Logs", self.tray_menu)
-        logs_action.triggered.connect(lambda: self.mostrar_logs.emit())
+        logs_action.triggered.connect(self._on_logs_triggered)
         self.tray_menu.addAction(logs_action)
         
         # Separador
@@ -148,9 +157,74 @@ class SystemTrayManager(QObject):
         
         # Sair
         quit_action = QAction("Sair", self.tray_menu)
-        quit_action.triggered.connect(lambda: self.sair_aplicacao.emit())
+        quit_action.triggered.connect(self._on_quit_triggered)
         self.tray_menu.addAction(quit_action)
+        
+        # Reconstruído sob demanda, só quando o menu for exibido
+        self.tray_menu.aboutToShow.connect(self._rebuild_if_dirty)
+        self._rebuild_if_dirty()
+        
+        # Configurar menu no ícone
+        self.tray_icon.setContextMenu(self.tray_menu)
+    
+    @Slot()
+    def _rebuild_if_dirty(self):
+        """Reconstrói o menu se a lista de servidores mudou desde a última vez"""
+        # Menu aberto dentro da janela de agrupamento: aplicar já
+        if self._rebuild_timer.isActive():
+            self._rebuild_timer.stop()
+            self._aplicar_servidores_pendentes()
+        if not self._menu_dirty:
+            return
+        self._update_menu()
+        self._menu_dirty = False
     
+    def _update_menu(self):
+        """Atualiza ações de conexão rápida, reaproveitando as existentes"""
+        if not self.tray_menu:
+            return
+        
+        novos = set(self._sorted_server_names)
+        
+        # Remover ações de servidores que não existem mais
+        for servidor in set(self._server_actions) - novos:
+            action = self._server_actions.pop(servidor)
+            self.tray_menu.removeAction(action)
+            action.deleteLater()
+        
+        # Criar ações só para servidores novos; percorrendo a lista ordenada
+        # de trás para frente, cada nova ação entra antes da seguinte
+        antes = self._servers_separator
+        for servidor in reversed(self._sorted_server_names):
+            action = self._server_actions.get(servidor)
+            if action is None:
+                action = QAction(f"Conectar a {servidor}", self.tray_menu)
+                action.setData(servidor)
+                action.triggered.connect(self._on_connect_triggered)
+                self.tray_menu.insertAction(antes, action)
+                self._server_actions[servidor] = action
+            antes = action
+        
+        self._servers_separator.setVisible(bool(self._server_actions))
+    
+    @Slot()
+    def _on_connect_triggered(self):
+        """Conexão rápida: o servidor vem do data() da ação disparada"""
+        self.conectar_servidor.emit(self.sender().data())
+    
+    @Slot()
+    def _on_show_triggered(self):
+        self.mostrar_janela.emit()
+    
+    @Slot()
+    def _on_logs_triggered(self):
+        self.mostrar_logs.emit()
+    
+    @Slot()
+    def _on_quit_triggered(self):
+        self.sair_aplicacao.emit()
+    
+    @Slot(QSystemTrayIcon.ActivationReason)
     def _on_tray_activated(self, reason):
         """Trata ativação do ícone do tray"""
         if reason == QSystemTrayIcon.ActivationReason.DoubleClick:
@@ -166,12 +240,36 @@ class SystemTrayManager(QObject):
         """
         Atualiza lista de servidores no menu
         
+        Chamadas em sequência dentro de 50 ms são agrupadas; só o último
+        estado é aplicado quando o timer dispara.
+        
         Args:
             servidores: Dict com nome_servidor -> (ip, usuario)
         """
-        self.servidores = servidores.copy()
-        self._update_menu()
-        logger.debug(f"Menu do tray atualizado com {len(servidores)} servidores")
+        self._pending_servidores = servidores.copy()
+        self._rebuild_timer.start()
+    
+    @Slot()
+    def _aplicar_servidores_pendentes(self):
+        """Aplica o último estado recebido por atualizar_menu_servidores"""
+        servidores = self._pending_servidores
+        if servidores is None:
+            return
+        self._pending_servidores = None
+        
+        servidores_snapshot = frozenset(servidores.items())
+        if servidores_snapshot == self._servidores_snapshot:
+            return
+        
+        self._servidores_snapshot = servidores_snapshot
+        self.servidores = servidores
+        # Servidores de conexão rápida (exceto "Manual"), ordenados uma vez
+        self._sorted_server_names = sorted(n for n in servidores if n != "Manual")
+        self._menu_dirty = True
+        # Com o menu visível não haverá aboutToShow: atualizar agora
+        if self.tray_menu is not None and self.tray_menu.isVisible():
+            self._rebuild_if_dirty()
+        logger.debug("Menu do tray atualizado com %d servidores", len(servidores))
     
     def notificar(self, titulo: str, mensagem: str, tipo: str = "information"):
         """
@@ -185,15 +283,7 @@ class SystemTrayManager(QObject):
         if not self.tray_icon:
             return
         
-        # Mapear tipos para ícones do Qt
-        icon_map = {
-            "information": QSystemTrayIcon.MessageIcon.Information,
-            "warning": QSystemTrayIcon.MessageIcon.Warning,
-            "critical": QSystemTrayIcon.MessageIcon.Critical,
-            "error": QSystemTrayIcon.MessageIcon.Critical
-        }
-        
-        icon = icon_map.get(tipo, QSystemTrayIcon.MessageIcon.Information)
+        icon = _NOTIFY_ICON_MAP.get(tipo, QSystemTrayIcon.MessageIcon.Information)
         
         try:
             self.tray_icon.showMessage(titulo, mensagem, icon, 5000)  # 5 segundos
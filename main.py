@@ -3,21 +3,26 @@
 FreeRDP-GUI - Interface gráfica moderna para conexões RDP
 """
 
+import os
 import sys
+import importlib.util
 import logging
-import atexit
 import signal
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
 import subprocess
 
-# Adicionar diretório do projeto ao path
-PROJECT_ROOT = Path(__file__).parent
-sys.path.insert(0, str(PROJECT_ROOT))
+# Adicionar diretório do projeto ao path (se o Python já não o colocou em sys.path[0])
+# No executável do PyInstaller os dados ficam em sys._MEIPASS
+PROJECT_ROOT = Path(getattr(sys, '_MEIPASS', Path(__file__).parent))
+if not getattr(sys, 'frozen', False) and (
+    not sys.path or os.path.realpath(sys.path[0]) != os.path.realpath(PROJECT_ROOT)
+):
+    sys.path.insert(0, str(PROJECT_ROOT))
 
 # Variáveis globais
-shared_memory = None
 logger = None
-local_server = None
 activation_pending = False
 
 def mostrar_erro_dialog(titulo, mensagem):
@@ -50,47 +55,74 @@ def mostrar_erro_dialog(titulo, mensagem):
             print(mensagem)
             print("-" * 50)
 
-def cleanup_shared_memory():
-    """Limpa a memória compartilhada na saída"""
-    global shared_memory, logger
-    if shared_memory and shared_memory.isAttached():
-        shared_memory.detach()
-        if logger:
-            logger.info("Memória compartilhada liberada")
-
 def signal_handler(signum, frame):
-    """Handler para sinais do sistema"""
-    global logger
-    if logger:
-        logger.info(f"Sinal {signum} recebido, encerrando aplicação...")
-    cleanup_shared_memory()
-    sys.exit(0)
+    """
+    Handler para sinais do sistema
+    
+    Não faz nada de propósito: o interpretador grava o número do sinal no
+    wakeup fd (signal.set_wakeup_fd) e o encerramento roda no loop do Qt.
+    """
+    pass
+
+@contextmanager
+def instancia_unica(app_id: str):
+    """
+    Trava de instância única e servidor de ativação
+    
+    Produz o QLocalServer de ativação se esta for a primeira instância ou
+    None se outra já estiver rodando. Servidor e trava são liberados uma
+    única vez, ao sair do bloco.
+    """
+    from PySide6.QtCore import QLockFile
+    from PySide6.QtNetwork import QLocalServer
+
+    # Um arquivo com o PID do dono, liberado automaticamente se o processo morrer
+    lock_path = Path(tempfile.gettempdir()) / f"{app_id}-{os.getuid()}.lock"
+    lock = QLockFile(str(lock_path))
+    lock.setStaleLockTime(0)
+    if not lock.tryLock(100):
+        yield None
+        return
+
+    # Com a trava em mãos, qualquer socket com este nome é resto de um
+    # processo morto: remover antes de escutar, sem tentativa prévia
+    activation_server_name = f"{app_id}-activation"
+    local_server = QLocalServer()
+    QLocalServer.removeServer(activation_server_name)
+    if local_server.listen(activation_server_name):
+        logger.info("Servidor de ativação criado com sucesso - primeira instância")
+    else:
+        logger.error(f"Falha crítica: não foi possível criar servidor de ativação: {local_server.errorString()}")
+
+    try:
+        yield local_server
+    finally:
+        local_server.close()
+        lock.unlock()
 
 def main():
     """Função principal da aplicação"""
-    global shared_memory, logger
+    global logger
     
     # Verificar dependências críticas de importação
     try:
-        from PySide6.QtWidgets import QApplication, QMessageBox
-        from PySide6.QtCore import QIODevice
+        from PySide6.QtWidgets import QApplication, QMessageBox, QSplashScreen
+        from PySide6.QtCore import QIODevice, QSocketNotifier
         from PySide6.QtGui import QIcon
-        from PySide6.QtNetwork import QLocalServer, QLocalSocket
+        from PySide6.QtNetwork import QLocalSocket
     except ImportError:
         mensagem = "PySide6 não está instalado.\n\nInstale com:\npip install PySide6"
         mostrar_erro_dialog("Erro de Dependência", mensagem)
         return 1
     
-    try:
-        from cryptography.fernet import Fernet
-    except ImportError:
+    # Só verificar presença: o módulo é carregado junto com core.crypto
+    if importlib.util.find_spec("cryptography") is None:
         mensagem = "Biblioteca 'cryptography' não está instalada.\n\nInstale com:\npip install cryptography"
         mostrar_erro_dialog("Erro de Dependência", mensagem)
         return 1
     
     try:
         from core.utils import setup_logging, verificar_comando_disponivel
-        from gui.main_window import FreeRDPGUIWindow
     except ImportError as e:
         mensagem = f"Erro ao importar módulos do projeto:\n\n{e}"
         mostrar_erro_dialog("Erro de Importação", mensagem)
@@ -102,8 +134,10 @@ def main():
     app.setApplicationName("FreeRDP-GUI")
     app.setApplicationVersion("2.1.0")
     app.setOrganizationName("FreeRDP-GUI")
+    QIcon.setFallbackThemeName("hicolor")
 
-    # Definir ícone global da aplicação (usar assets/rdp-icon.png quando disponível)
+    # Definir ícone global da aplicação (usar assets/rdp-icon.png quando disponível);
+    # janela principal e de logs o herdam, sem procurar o arquivo de novo
     try:
         # Importante: logger ainda não existe aqui, então usamos prints em caso de falha silenciosa
         icon_path = PROJECT_ROOT / "assets" / "rdp-icon.png"
@@ -124,67 +158,33 @@ def main():
     logger = setup_logging()
     logger.info("=== FreeRDP-GUI iniciado ===")
 
-    # Ativar handler para sinais do sistema
+    # Ativar handler para sinais do sistema: o sinal só acorda o loop do
+    # Qt pelo pipe; log e encerramento acontecem fora do handler.
+    # Até a janela existir basta app.quit; depois o sinal passa por
+    # sair_aplicacao, que salva configurações e encerra as conexões RDP
+    sinal_r, sinal_w = os.pipe()
+    os.set_blocking(sinal_r, False)
+    os.set_blocking(sinal_w, False)
+    signal.set_wakeup_fd(sinal_w)
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
+    encerrar = app.quit
 
-    # Definir função de verificar dependências (precisa estar após importações)
-    def verificar_dependencias():
-        """Verifica dependências críticas"""
-        import shutil
-        
-        dependencias_faltando = []
-        
-        # Verificar FreeRDP (sistema ou Flathub)
-        freerdp_disponivel = False
-        
-        # Primeiro, tentar FreeRDP do Flathub
+    def handle_sinal():
+        """Encerra a aplicação ao receber SIGINT/SIGTERM."""
         try:
-            result = subprocess.run(
-                ["flatpak", "run", "com.freerdp.FreeRDP", "/help"],
-                capture_output=True, timeout=10
-            )
-            # Aceitar qualquer código de retorno que não seja erro de comando não encontrado
-            if result.returncode != 127:  # 127 = comando não encontrado
-                freerdp_disponivel = True
-                print("✅ FreeRDP do Flathub detectado")
-        except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError):
-            pass
-        
-        # Se não encontrou no Flathub, verificar no sistema
-        if not freerdp_disponivel:
-            # Tentar diferentes nomes de comando
-            for cmd in ["xfreerdp3", "xfreerdp", "freerdp"]:
-                if shutil.which(cmd):
-                    freerdp_disponivel = True
-                    print(f"✅ FreeRDP do sistema detectado ({cmd})")
-                    break
-        
-        if not freerdp_disponivel:
-            dependencias_faltando.append("FreeRDP (instale: sudo apt install freerdp2-x11 OU flatpak install flathub com.freerdp.FreeRDP)")
-        
-        if dependencias_faltando:
-            erro = "Dependências faltando:\n\n" + "\n".join([f"• {dep}" for dep in dependencias_faltando])
-            erro += "\n\nInstale as dependências e tente novamente."
-            return False, erro
-        
-        return True, ""
+            sinais = os.read(sinal_r, 64)
+        except BlockingIOError:
+            return
+        for signum in sinais:
+            logger.info(f"Sinal {signum} recebido, encerrando aplicação...")
+        encerrar()
 
-    # Verificar dependências críticas
-    deps_ok, deps_erro = verificar_dependencias()
-    if not deps_ok:
-        logger.error("Dependências faltando")
-        print("\n" + "="*60)
-        print("❌ DEPENDÊNCIAS FALTANDO")
-        print("="*60)
-        print(deps_erro)
-        print("="*60)
-        return 1
+    sinal_notifier = QSocketNotifier(sinal_r, QSocketNotifier.Type.Read, app)
+    sinal_notifier.activated.connect(handle_sinal)
 
     # Verificar instância única e permitir ativação da instância existente
     app_id = 'freerdp-gui-b6166164-9b26-4c4f-9e7d-1c39c277f9c8'
-    activation_server_name = f"{app_id}-activation"
-    local_server = QLocalServer()
 
     def handle_local_activation():
         """Ativa a janela quando outra instância pedir."""
@@ -200,108 +200,114 @@ def main():
         finally:
             connection.disconnectFromServer()
 
-    # Tentar criar o servidor local para esta instância
-    logger.info(f"Tentando criar servidor de ativação: {activation_server_name}")
-    if not local_server.listen(activation_server_name):
-        # Se não conseguir ouvir, significa que já existe uma instância rodando
-        logger.info("Instância já existe, tentando ativar...")
+    # Trava de instância única + servidor de ativação, liberados uma única
+    # vez na saída do bloco (retorno normal, erro ou sinal)
+    with instancia_unica(app_id) as local_server:
+        if local_server is None:
+            logger.info("Instância já existe, tentando ativar...")
 
-        # Tentar ativar a instância existente
-        existing_socket = QLocalSocket()
-        existing_socket.connectToServer(activation_server_name, QIODevice.WriteOnly)
-        logger.info("Tentando conectar ao servidor existente...")
-        if existing_socket.waitForConnected(3000):
-            logger.info("Conexão estabelecida, enviando ativação...")
-            try:
-                existing_socket.write(b"ACTIVATE")
-                existing_socket.flush()
-                # Não esperar por confirmação - apenas desconectar
-                existing_socket.disconnectFromServer()
-                logger.info("Instância existente ativada com sucesso")
-            except Exception as e:
-                logger.warning(f"Erro ao enviar ativação: {e}")
-                existing_socket.disconnectFromServer()
-            return 0  # Sair desta instância
-        else:
-            error_msg = existing_socket.errorString()
-            logger.warning(f"Não foi possível conectar ao servidor existente: {error_msg}")
-            # Tentar limpar e criar novo servidor
-            logger.info("Tentando limpar servidor zombie...")
-            QLocalServer.removeServer(activation_server_name)
-            if not local_server.listen(activation_server_name):
-                logger.error("Falha crítica: não foi possível criar servidor de ativação após limpeza")
-                # Continuar sem controle de instância única como fallback
+            # Tentar ativar a instância existente
+            existing_socket = QLocalSocket()
+            existing_socket.connectToServer(f"{app_id}-activation", QIODevice.WriteOnly)
+            if existing_socket.waitForConnected(3000):
+                logger.info("Conexão estabelecida, enviando ativação...")
+                try:
+                    existing_socket.write(b"ACTIVATE")
+                    existing_socket.flush()
+                    # Não esperar por confirmação - apenas desconectar
+                    existing_socket.disconnectFromServer()
+                    logger.info("Instância existente ativada com sucesso")
+                except Exception as e:
+                    logger.warning(f"Erro ao enviar ativação: {e}")
+                    existing_socket.disconnectFromServer()
             else:
-                logger.info("Servidor de ativação criado após limpeza")
+                logger.warning(f"Não foi possível conectar ao servidor existente: {existing_socket.errorString()}")
+                QMessageBox.information(None, "FreeRDP-GUI", "O FreeRDP-GUI já está em execução.")
+            return 0  # Sair desta instância
 
-    else:
-        logger.info("Servidor de ativação criado com sucesso - primeira instância")
+        # Se chegou aqui, esta é a primeira instância
+        local_server.newConnection.connect(handle_local_activation)
 
-    # Se chegou aqui, esta é a primeira instância ou conseguimos criar o servidor
-    local_server.newConnection.connect(handle_local_activation)
+        # Splash visível enquanto a janela principal e suas dependências carregam
+        splash = None
+        if app_icon is not None and not app_icon.isNull():
+            splash = QSplashScreen(app_icon.pixmap(128, 128))
+            splash.show()
+            app.processEvents()
 
-    # Garantir que o servidor de ativação seja fechado na saída
-    atexit.register(lambda: local_server.close())
+        # Só a primeira instância paga pela importação da janela principal
+        # (core.crypto, cryptography, core.servidores...)
+        try:
+            from gui.main_window import FreeRDPGUIWindow
+        except ImportError as e:
+            logger.exception("Erro ao importar janela principal")
+            if splash:
+                splash.close()
+            mostrar_erro_dialog("Erro de Importação", f"Erro ao importar módulos do projeto:\n\n{e}")
+            return 1
 
-    # Criar a janela principal
-    try:
-        window = FreeRDPGUIWindow()
-        logger.info("Janela principal criada com sucesso")
-    except ImportError as e:
-        logger.exception(f"Erro de importação: {e}")
-        QMessageBox.critical(None, "Erro de Inicialização",
-                           f"Erro de dependência: {e}\n\n"
-                           f"Verifique se todas as bibliotecas estão instaladas:\n"
-                           f"• pip install PySide6\n"
-                           f"• pip install cryptography")
-        return 1
-    except Exception as e:
-        logger.exception(f"Erro inesperado ao criar janela: {e}")
-        QMessageBox.critical(None, "Erro de Inicialização",
-                           f"Erro inesperado: {e}\n\n"
-                           f"Verifique os logs para mais detalhes.")
-        return 1
+        # Criar a janela principal
+        try:
+            window = FreeRDPGUIWindow()
+            logger.info("Janela principal criada com sucesso")
+        except ImportError as e:
+            if splash:
+                splash.close()
+            logger.exception(f"Erro de importação: {e}")
+            QMessageBox.critical(None, "Erro de Inicialização",
+                               f"Erro de dependência: {e}\n\n"
+                               f"Verifique se todas as bibliotecas estão instaladas:\n"
+                               f"• pip install PySide6\n"
+                               f"• pip install cryptography")
+            return 1
+        except Exception as e:
+            if splash:
+                splash.close()
+            logger.exception(f"Erro inesperado ao criar janela: {e}")
+            QMessageBox.critical(None, "Erro de Inicialização",
+                               f"Erro inesperado: {e}\n\n"
+                               f"Verifique os logs para mais detalhes.")
+            return 1
 
-    # Conectar sinais de encerramento
-    app.aboutToQuit.connect(cleanup_shared_memory)
-    
-    # Conectar sinal personalizado da janela principal
-    try:
-        window.aplicacao_deve_sair.connect(app.quit)
-    except AttributeError:
-        logger.warning("Sinal aplicacao_deve_sair não encontrado na janela principal")
+        # Conectar sinal personalizado da janela principal
+        try:
+            window.aplicacao_deve_sair.connect(app.quit)
+        except AttributeError:
+            logger.warning("Sinal aplicacao_deve_sair não encontrado na janela principal")
+        else:
+            encerrar = window.sair_aplicacao
 
-    # Mostrar janela
-    try:
-        window.show()
-        logger.info("Interface inicializada com sucesso")
+        # Mostrar janela
+        try:
+            window.show()
+            if splash:
+                splash.finish(window)
+            logger.info("Interface inicializada com sucesso")
         
-        # Verificar se há ativação pendente
-        global activation_pending
-        if activation_pending:
-            window.show_window()
-            activation_pending = False
-            logger.info("Janela ativada devido a solicitação de outra instância")
+            # FreeRDP verificado em segundo plano, com a janela já na tela
+            window.verificar_freerdp_em_segundo_plano()
+        
+            # Verificar se há ativação pendente
+            global activation_pending
+            if activation_pending:
+                window.show_window()
+                activation_pending = False
+                logger.info("Janela ativada devido a solicitação de outra instância")
             
-    except Exception as e:
-        logger.exception(f"Erro ao mostrar janela: {e}")
-        QMessageBox.critical(None, "Erro",
-                           f"Erro ao inicializar interface: {e}")
-        return 1
+        except Exception as e:
+            logger.exception(f"Erro ao mostrar janela: {e}")
+            QMessageBox.critical(None, "Erro",
+                               f"Erro ao inicializar interface: {e}")
+            return 1
 
-    # Executar aplicação
-    try:
-        result = app.exec()
-        logger.info(f"Aplicação encerrada com código: {result}")
-        return result
-    except KeyboardInterrupt:
-        logger.info("Aplicação interrompida pelo usuário (Ctrl+C)")
-        return 0
-    except Exception as e:
-        logger.exception(f"Erro durante execução: {e}")
-        return 1
-    finally:
-        cleanup_shared_memory()
+        # Executar aplicação
+        try:
+            result = app.exec()
+            logger.info(f"Aplicação encerrada com código: {result}")
+            return result
+        except Exception as e:
+            logger.exception(f"Erro durante execução: {e}")
+            return 1
 
 if __name__ == "__main__":
     try:
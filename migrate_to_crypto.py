@@ -4,19 +4,77 @@ Script de migração para FreeRDP-GUI v2.0
 Migra senhas do keyring para o novo sistema de criptografia
 """
 
+import os
 import sys
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-# Adicionar diretório do projeto
+# Adicionar diretório do projeto (se o Python já não o colocou em sys.path[0])
 PROJECT_ROOT = Path(__file__).parent
-sys.path.insert(0, str(PROJECT_ROOT))
+if not sys.path or os.path.realpath(sys.path[0]) != os.path.realpath(PROJECT_ROOT):
+    sys.path.insert(0, str(PROJECT_ROOT))
 
 from core.utils import setup_logging
 from core.servidores import get_servidor_manager
 from core.crypto import get_crypto_manager
 from gui.master_password_dialog import solicitar_master_password
 
+try:
+    import keyring
+    from keyring.errors import KeyringError
+except ImportError:
+    keyring = None
+    KeyringError = Exception
+
+# Resolvido uma vez: evita tentar (e falhar) a cada servidor
+_KEYRING_OK = keyring is not None and hasattr(keyring, "get_password")
+
+# Consultas ao keyring são IPC (D-Bus): várias em paralelo escondem a latência
+_KEYRING_WORKERS = 8
+
+def _keyring_permite_paralelo():
+    """
+    Indica se o backend ativo aguenta chamadas concorrentes
+    
+    Só o Secret Service abre uma conexão D-Bus por chamada; para os demais
+    backends não há garantia de thread safety.
+    """
+    backend = keyring.get_keyring()
+    backends = getattr(backend, "backends", None) or [backend]
+    return all(type(b).__module__ == "keyring.backends.SecretService" for b in backends)
+
+def _mapear_keyring(funcao, itens):
+    """
+    Aplica funcao(*item) a cada item, mantendo a ordem dos resultados
+    
+    A primeira chamada é sempre serial: com o keyring trancado, ela dispara
+    o único pedido de desbloqueio antes das demais rodarem em paralelo.
+    """
+    if not itens:
+        return []
+    resultados = [funcao(*itens[0])]
+    restantes = itens[1:]
+    if len(restantes) < 2 or not _keyring_permite_paralelo():
+        return resultados + [funcao(*item) for item in restantes]
+    with ThreadPoolExecutor(max_workers=_KEYRING_WORKERS) as executor:
+        return resultados + list(executor.map(lambda item: funcao(*item), restantes))
+
+def _buscar_senha_keyring(nome_servidor, usuario):
+    """Consulta o keyring; retorna (senha, erro)"""
+    try:
+        return keyring.get_password(nome_servidor, usuario), None
+    except KeyringError as e:
+        return None, e
+
+def _remover_senha_keyring(nome_servidor, usuario):
+    """Remove a senha do keyring; retorna o erro ou None"""
+    try:
+        keyring.delete_password(nome_servidor, usuario)
+        return None
+    except KeyringError as e:
+        return e
+
 def main():
     """Função principal de migração"""
     print("=" * 60)
@@ -27,9 +85,7 @@ def main():
     # Configurar logging
     logger = setup_logging()
     
-    try:
-        import keyring
-    except ImportError:
+    if not _KEYRING_OK:
         print("❌ Keyring não está disponível. Nada para migrar.")
         return 0
     
@@ -43,16 +99,18 @@ def main():
     
     print("🔍 Procurando senhas no keyring...")
     
-    for nome_servidor, (ip, usuario) in servidores.items():
-        if nome_servidor == "Manual":
-            continue
-        
-        try:
-            senha = keyring.get_password(nome_servidor, usuario)
-            if senha:
-                senhas_encontradas.append((nome_servidor, usuario, senha))
-        except Exception as e:
-            print(f"⚠️  Erro ao verificar {nome_servidor}: {e}")
+    candidatos = [
+        (nome_servidor, usuario)
+        for nome_servidor, (ip, usuario) in servidores.items()
+        if nome_servidor != "Manual"
+    ]
+    
+    resultados = _mapear_keyring(_buscar_senha_keyring, candidatos)
+    for (nome_servidor, usuario), (senha, erro) in zip(candidatos, resultados):
+        if erro is not None:
+            print(f"⚠️  Erro ao verificar {nome_servidor}: {erro}")
+        elif senha:
+            senhas_encontradas.append((nome_servidor, usuario, senha))
     
     if not senhas_encontradas:
         print("✅ Nenhuma senha encontrada no keyring. Migração não necessária.")
@@ -76,8 +134,7 @@ def main():
         from PySide6.QtWidgets import QApplication
         app = QApplication.instance() or QApplication(sys.argv)
         
-        senha_master = solicitar_master_password(None, is_first_time=True)
-        if not senha_master:
+        if not solicitar_master_password(None, is_first_time=True):
             print("❌ Master password é obrigatória para migração.")
             return 1
     except:
@@ -113,27 +170,29 @@ def main():
     migradas = 0
     erros = 0
     
-    for nome_servidor, usuario, senha in senhas_encontradas:
-        try:
-            print(f"   Migrando {nome_servidor}...", end=" ")
-            
-            # Salvar no novo sistema
-            if servidor_manager.salvar_senha(nome_servidor, senha):
-                # Remover do keyring
-                try:
-                    keyring.delete_password(nome_servidor, usuario)
-                    print("✅")
-                    migradas += 1
-                except Exception as e:
-                    print(f"⚠️  (salva mas erro ao remover do keyring: {e})")
-                    migradas += 1
-            else:
-                print("❌")
-                erros += 1
-                
-        except Exception as e:
-            print(f"❌ Erro: {e}")
+    # Todas as senhas gravadas no INI de uma vez
+    salvos = set(servidor_manager.salvar_senhas(
+        {nome_servidor: senha for nome_servidor, _, senha in senhas_encontradas}
+    ))
+    
+    # Só então remover do keyring o que foi salvo
+    removidos = [(nome, usuario) for nome, usuario, _ in senhas_encontradas if nome in salvos]
+    erros_remocao = _mapear_keyring(_remover_senha_keyring, removidos)
+    erros_por_servidor = dict(zip((nome for nome, _ in removidos), erros_remocao))
+    
+    for nome_servidor, usuario, _ in senhas_encontradas:
+        print(f"   Migrando {nome_servidor}...", end=" ")
+        if nome_servidor not in salvos:
+            print("❌")
             erros += 1
+            continue
+        
+        erro = erros_por_servidor[nome_servidor]
+        if erro is None:
+            print("✅")
+        else:
+            print(f"⚠️  (salva mas erro ao remover do keyring: {erro})")
+        migradas += 1
     
     print()
     print("=" * 60)